@@ -13,8 +13,13 @@ pip install openai==0.2.0
 
 # Librerias principales
 import speech_recognition as sr     # Reconocimiento de voz
-import openai                       # API de OpenAI conexion con GPT
 from naoqi import ALProxy, ALModule # Clases de Naoqi v2.1.4.13
+from planificador import Planificador # Limites de tiempo por turno
+from efectos import EfectosLeds, EFECTOS_ESTADO # Efectos de leds en segundo plano y el de cada estado
+from reconocimiento import ReconocedorIncremental # SR por segmentos mientras se habla
+from maquina import MaquinaConversacion # Estados de la conversacion
+from ia import IA                     # Conexion con GPT, con control de consumo
+from enrutador import Enrutador       # Motor y tokens por nivel de pregunta
 
 # Librerías auxiliares
 import copy
@@ -38,6 +43,14 @@ PALABRAS = {
     'despedida': ["adios","chao","chau",u'adiós'],
 }
 
+# Contexto de la IA
+CONTEXTO = ("\nContexto:Eres NAO, un robot asistente educativo. "
+            "Tu funcion es explicar temas complejos de forma clara y asistir en la educación. "
+            "Debes mantener las respuestas cortas, concisas y claras. Ten en cuenta que tu audiencia "
+            "pueden ser niños y adultos mayores, por lo que debes ser muy amable y entretenido para todos."
+            " Si alguien pregunta donde estás, di que en el Robotifest 2023 de la Universidad de Costa Rica."
+            " Responde utilizando lenguaje sencillo y cordial, como en una conversación, de forma amigable.")
+
 # Definición de clases
 class NAO():
     """
@@ -54,6 +67,8 @@ class NAO():
         API para adoptar posturas
     leds : object
         API que permite controlar leds
+    efectos : EfectosLeds
+        Motor de efectos de leds, ejecuta las animaciones en segundo plano segun el estado
     alp : object
         API Autonomous life 
         Permite configurar el modo vida autónoma del robot
@@ -75,9 +90,12 @@ class NAO():
             Dice texto de despedida
             Adopta posición Crouch
 
-    responder(texto, motor_ia=None)
-        El robot genera una respuesta a partir del texto y el motor de IA.
-        Posteriormente enciende sus leds y dice la respuesta.
+    pensar()
+        El robot dice una frase de relleno sin bloquear, mientras espera la respuesta de la IA
+    generar(texto, generador)
+        Genera la respuesta al texto con el generador, sin decirla
+    decir(respuesta)
+        El robot dice la respuesta con el efecto de leds 'hablando'
     """
 
 
@@ -94,6 +112,7 @@ class NAO():
         self.asp = ALProxy("ALAnimatedSpeech", ip_nao, port_nao)
         self.posturas = ALProxy("ALRobotPosture", ip_nao, port_nao)
         self.leds = ALProxy("ALLeds", ip_nao, port_nao)
+        self.efectos = EfectosLeds(self.leds)
         self.alp = ALProxy("ALAutonomousLife", ip_nao, port_nao)
 
     def iniciar(self):
@@ -104,14 +123,11 @@ class NAO():
         time.sleep(1)
 
     def saludo(self):
-        nao.posturas.goToPosture("StandInit",0.5)
+        self.posturas.goToPosture("StandInit",0.5)
         time.sleep(1)
         self.alp.setState("solitary")
         time.sleep(0.5)
-        try:
-            nao.leds.on("AllLeds")
-        except:
-            print('Error de leds')
+        self.efectos.estado('hablando')
         self.asp.say(" ^start(animations/Stand/Gestures/Hey_6) Hola, ^wait(animations/Stand/Gestures/Hey_6)"
                      " ^start(animations/Stand/Gestures/Me_1) soy NAO, tu asistente, preguntame lo que quieras"
                      " y te ayudaré ^wait(animations/Stand/Gestures/Me_1) ")
@@ -128,208 +144,168 @@ class NAO():
         time.sleep(1)
 
 
-    def responder(self, texto, generador=None):
-        self.leds.rasta(1.5)
-        if generador==None:
-            self.tts.say("Creo que no tengo respuesta para eso")
-            print ("El generador no funciona. Texto Original:\n" + texto)
-        else:
-            if type(texto) == str:
-                respuesta = generador(texto).strip()
-            else:
-                respuesta = generador((texto.encode('utf-8'))).strip()
-            
-            if type(respuesta) == str:
-                print(respuesta)
-                self.asp.say(respuesta, {"bodyLanguageMode":"random"})
-            else:
-                print(respuesta)
-                self.asp.say(respuesta.encode(('utf-8')), {"bodyLanguageMode":"random"})
-        time.sleep(0.25)
-
-##Clase IA, genera las respuestas mediante conexion al motor de IA gpt 3.5
-class IA():
-    """
-    Clase que representa la inteligencia artificial, conecta con la API, almacena infomacion de parametros y conversacion
-    ...
-    Atributos 
-    ----------
-    ENGINE : str
-        API Text-to-speech del nao
-    CONTEXT : object
-        API Animated text del NAO
-        Permite al robot moverse mientras habla de forma integrada
-    MT : str
-        Limite de tokens maximos por respuesta
+    def pensar(self):
+        self.tts.post.say("Déjame pensar...")
 
-    Metodos
-    -------
-    respuesta(texto)
-        Genera una respuesta con un motor de IA a partir del input del usuario y la conversacion anterior:
-            Agrega el texto a la lista de conversacion
-            Genera una respuesta pasando los parametros y la conversacion al API
-            Agrega la respuesta a la lista de conversacion y la devuelve  
-    """
-    def __init__(self):
-        self.ENGINE = "gpt-3.5-turbo-instruct"
-        self.CONTEXT = ("\nContexto:Eres NAO, un robot asistente educativo. "
-                        "Tu funcion es explicar temas complejos de forma clara y asistir en la educación. "
-                        "Debes mantener las respuestas cortas, concisas y claras. Ten en cuenta que tu audiencia "
-                        "pueden ser niños y adultos mayores, por lo que debes ser muy amable y entretenido para todos."
-                        " Si alguien pregunta donde estás, di que en el Robotifest 2023 de la Universidad de Costa Rica."
-                        " Responde utilizando lenguaje sencillo y cordial, como en una conversación, de forma amigable.")
-        self.MT = 85
-        self.conversacion = []
-        openai.api_key = env.apikey
-
-    def respuesta(self, pregunta):
-        
-        self.conversacion.append("\nPregunta: "+pregunta)
-
-        if len(self.conversacion)==1:
-            dialogo = self.conversacion[-1]
-        elif len(self.conversacion)>2:
-            dialogo = (self.conversacion[-3] + self.conversacion[-2] + self.conversacion[-1])
-        else:
-            dialogo = "\nPregunta: "+pregunta
-
-        response = openai.Completion.create(
-            engine=self.ENGINE,  
-            prompt = (self.CONTEXT+dialogo+"\nRespuesta: "),
-            max_tokens= self.MT  
-        )
-        output = (response.choices[0].text)
-        end = max([output.rfind('.'), output.rfind('?'), output.rfind('!')])
-        if len(output) > 0:
-            respuesta = output[:end+1]
+    def generar(self, texto, generador):
+        if type(texto) == str:
+            return generador(texto).strip()
         else:
-            respuesta = ' '
+            return generador((texto.encode('utf-8'))).strip()
 
+    def decir(self, respuesta):
+        self.efectos.estado('hablando')
         if type(respuesta) == str:
-            self.conversacion.append("\nRespuesta: "+respuesta)
+            print(respuesta)
+            self.asp.say(respuesta, {"bodyLanguageMode":"random"})
         else:
-            self.conversacion.append("\nRespuesta: "+respuesta.encode('utf-8'))
+            print(respuesta)
+            self.asp.say(respuesta.encode(('utf-8')), {"bodyLanguageMode":"random"})
 
-        return respuesta
-    
 
 """
-Codigo principal
-MAIN
+Estados de la conversacion
+Cada funcion es la accion que se ejecuta al entrar al estado, corre en el ejecutor de la maquina
+Retorna el evento que produce la siguiente transicion
+
+    espera: escucha hasta que el usuario diga una palabra clave de saludo
+    saludo: el robot se levanta y da la bienvenida
+    escuchando: escucha la pregunta, el SR transcribe por segmentos mientras el usuario habla
+    pensando: obtiene el texto final, si es una despedida termina, si no genera la respuesta con la IA
+    hablando: el robot dice la respuesta
+    despedida: el robot se despide y regresa a la posicion inicial
+"""
 
-Se inicializan las clases: NAO, IA, sr.Recognizer 
-Se configuran modificadores, variables y se enciende el robot
+def esperar(datos):
+    with sr.Microphone() as source:
+        try:
+            reconocedor.escuchar(source,3)
+        except OSError:
+            print('\nError: Timeout Microfono\nEs posible que el MIC este desconectado, verificar\n')
+            return 'nada'
+    try:
+        input_text = reconocedor.finalizar()
+        print("Usuario: " +  (input_text))
+    except LookupError:
+        print("Voz no detectada\n")
+        return 'nada'
 
-"""
+    # Verifica si el usuario saludo al nao en modo espera
+    if any([palabra in input_text.lower() for palabra in PALABRAS["saludo"]]):
+        return 'activar'
+    return 'nada'
+
+def saludar(datos):
+    nao.saludo()
+    print('te escucho')
+    return 'listo'
+
+def escuchar(datos):
+    with sr.Microphone() as source:
+        print("Escuchando...\n")
+        try:
+            # Se transcribe por segmentos mientras el usuario habla
+            reconocedor.escuchar(source,3)
+        except OSError:
+            print('\nError: Timeout Microfono\nEs posible que el MIC este desconectado, verificar\n')
+            nao.efectos.estado('error')
+            return 'nada'
+    return 'frase'
 
+def pensar(datos):
+    try:
+        # Utiliza el reconocimiento de voz para obtener el texto, solo falta el ultimo segmento
+        input_text = reconocedor.finalizar()
+        print("Usuario: " +  (input_text))
+    except LookupError:
+        print("Voz no detectada\n")
+        return 'nada'
+
+    ##Si el usuario despide al nao, despedir al usuario y apagar
+    if any([palabra in  (input_text.lower()) for palabra in PALABRAS["despedida"]]):
+        return 'despedir'
 
-###Inicializar clases
-nao = NAO(IP, PORT)
-ia = IA()
-recognizer = sr.Recognizer("es-CR") # Inicializa el reconocimiento de voz
+    # Si el usuario hizo una pregunta, procesa el texto con IA
+    print("\nRespuesta:")
+    return ('respuesta', nao.generar(input_text, planificador.responder))
 
-recognizer.pause_threshold = 1 # Finaliza el SR al detectar silencio de 1s     
+def hablar(respuesta):
+    nao.decir(respuesta)
+    time.sleep(0.25)
+    return 'listo'
 
-#Encender robot
-nao.iniciar()
+def despedir(datos):
+    nao.despedida()
+    nao.efectos.estado('apagado')
+    time.sleep(3)
+    nao.posturas.goToPosture('StandInit',0.5)
+    time.sleep(2)
+    return 'listo'
 
-## Variable global
-escuchaActiva = False # False si el robot solo espera ordenes de activacion, True si toma el SR para responder
 
 """
-Flujo de ejecucion
+Codigo principal
+MAIN
 
-En cada ejecucion del while, se escucha por medio del microfono el input del usuario, y se procesa con SR
+Se inicializan las clases: NAO, IA, Planificador, sr.Recognizer, ReconocedorIncremental y MaquinaConversacion
+Se configuran modificadores, variables y se enciende el robot
 
-Se inicia el robot en modo espera, escuchaActiva == False:
-    Si se identifica una palabra clave de inicio se activa el robot
+"""
 
-Si escuchaActiva == True:
-    Modo conversacion:
-        Si se identifica una palabra clave de despedida, se termina el programa
+def main():
+    global nao, ia, planificador, recognizer, reconocedor
 
-        Si no, se pasa el input al nao para que lo procese con el motor de IA, y diga la respuesta     
-    
-Fin de programa:
-    Apaga Leds
-    Se despide
-    Regresa a posicion inicial 
+    ###Inicializar clases
+    nao = NAO(IP, PORT)
+    ia = IA(CONTEXTO, enrutador=Enrutador())
+    planificador = Planificador(ia.generar, nao.pensar, registrar=ia.recordar) # Respuestas con limite de tiempo por turno
+    recognizer = sr.Recognizer("es-CR") # Inicializa el reconocimiento de voz
 
-"""
+    recognizer.pause_threshold = 1 # Finaliza el SR al detectar silencio de 1s     
+    reconocedor = ReconocedorIncremental(recognizer, sr.Microphone()) # Transcribe mientras el usuario habla
 
+    #Encender robot
+    nao.iniciar()
 
-#Instrucción inicial
-print("\nDecir HOLA o NAO para iniciar\n")
+    """
+    Flujo de ejecucion
 
-### Rutina Principal
-while True:
+    La maquina inicia en el estado espera, y cambia de estado con el evento que retorna cada accion:
+        espera --activar--> saludo --listo--> escuchando --frase--> pensando --respuesta--> hablando --listo--> escuchando
+        pensando --despedir--> despedida --listo--> fin
+        Si no se detecta voz, el evento 'nada' vuelve a escuchar
 
-    ## hacer algo con leds
-    with sr.Microphone() as source:
-        if escuchaActiva==True:
-            try:
-                nao.leds.setIntensity("AllLeds", 0)
-                nao.leds.setIntensity("AllLedsBlue", 0.9)
-            except:
-                print('ErrorLeds')
+    Las acciones corren en hilos del ejecutor, el ciclo de eventos solo aplica transiciones
+    y cambia el efecto de leds de cada estado
 
-        print("Escuchando...\n")
+    Fin de programa:
+        Apaga Leds
+        Se despide
+        Regresa a posicion inicial 
 
-        try:
-            ##animacion orejas
-            audio = recognizer.listen(source,3)
-        except OSError:
-            print('\nError: Timeout Microfono\nEs posible que el MIC este desconectado, verificar\n')
-            if escuchaActiva==True:
-                try:
-                    nao.leds.setIntensity("AllLeds", 0)
-                    nao.leds.setIntensity("AllLedsRed", 0.9)
-                except:
-                    print('ErrorLeds')
-            continue
-
-        if escuchaActiva==True:
-                try:
-                    nao.leds.on('AllLeds')
-                except:
-                    print('ErrorLeds')
-    
+    """
+
+    maquina = MaquinaConversacion({
+        'espera': esperar,
+        'saludo': saludar,
+        'escuchando': escuchar,
+        'pensando': pensar,
+        'hablando': hablar,
+        'despedida': despedir,
+    }, alCambiar=lambda estado: nao.efectos.estado(EFECTOS_ESTADO[estado]))
+
+    #Instrucción inicial
+    print("\nDecir HOLA o NAO para iniciar\n")
+
+    ### Rutina Principal
+    maquina.ejecutar()
+
+    nao.efectos.detener()
+    print(planificador.resumen())
+    print(ia.contabilidad.resumen())
+    print(ia.enrutador.resumen())
+    print("PROGRAMA FINALIZADO")
 
-    try:
-        # Utiliza el reconocimiento de voz para obtener el texto
-        input_text = recognizer.recognize(audio)
-        print("Usuario: " +  (input_text))
-    
-        # Verifica si el usuario saludo al nao en modo espera
-        if  any([palabra in input_text.lower() for palabra in PALABRAS["saludo"]]) and escuchaActiva==False:
-            escuchaActiva=True
-            nao.saludo()
-            print('te escucho')
-
-        ##Si el usuario despide al nao en modo escucha activa, despedir al usuario y apagar        
-        elif any([palabra in  (input_text.lower()) for palabra in PALABRAS["despedida"]]) and escuchaActiva==True:
-            escuchaActiva=False
-            nao.despedida()
-            try:
-                nao.leds.off('AllLeds')
-            except Exception:
-                print('Error al apagar leds')
-
-            time.sleep(3)
-            nao.posturas.goToPosture('StandInit',0.5)
-            time.sleep(2)
-            break
-
-        # Si el usuario hizo una pregunta, procesa el texto y responde con IA
-        elif escuchaActiva==True:
-            print("\nRespuesta:")
-            ##Ir a interfase con modelo gpt
-            nao.responder(input_text,ia.respuesta)
-
-
-    #Si hay un error, seguir escuchando
-    except LookupError:
-        ##Ignorar, seguir escuchando
-        print("Voz no detectada\n")
 
-print("PROGRAMA FINALIZADO")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# -*- encoding: UTF-8 -*-
+"""
+# Librerías importadas
+## Por favor instalar las siguientes por medio de pip
+----------------------------------------
+pip install numpy
+----------------------------------------
+
+Formador de haz (beamforming) para los cuatro microfonos de la cabeza del NAO
+    Estima la direccion del usuario con SRP-PHAT (suma de correlaciones GCC-PHAT de cada
+    par de microfonos, evaluada en los retardos esperados de cada direccion)
+    Alinea los cuatro canales hacia esa direccion y los suma (delay-and-sum), lo que
+    refuerza la voz del usuario y atenua el ruido que llega de otras direcciones
+    Todo el procesamiento esta vectorizado con NumPy y funciona por bloques, para usarse
+    mientras se graba
+"""
+
+# Librerias principales
+import numpy as np
+
+# Librerías auxiliares
+import wave
+
+
+"""
+Declaracion de constantes
+    Geometria de los microfonos y parametros del procesamiento
+"""
+VELOCIDAD_SONIDO = 343.0    # m/s
+
+# Posiciones aproximadas de los microfonos en la cabeza del NAO en metros (x al frente, y a la izquierda)
+# El orden es el de los canales de ALAudioDevice: izquierdo, derecho, frontal, trasero
+POSICIONES = np.array([
+    [-0.0195,  0.0606, 0.0331],     # Izquierdo
+    [-0.0195, -0.0606, 0.0331],     # Derecho
+    [ 0.0489,  0.0,    0.0768],     # Frontal
+    [-0.0460,  0.0,    0.0814],     # Trasero
+])
+
+AZIMUTS = np.radians(np.arange(0, 360, 5))  # Direcciones candidatas en el plano horizontal
+
+SOBRESTIMACION_RUIDO = 2.0  # Factor del espectro de ruido al pesar las frecuencias, mayor ignora mas frecuencias ruidosas
+
+
+def retardosDireccion(azimuts, frecuencia, posiciones=POSICIONES):
+    """
+    Retardo de llegada a cada microfono, en muestras, para una fuente lejana en cada direccion
+
+    Retorna una matriz (direcciones, microfonos)
+    """
+    direcciones = np.stack([np.cos(azimuts), np.sin(azimuts), np.zeros(len(azimuts))], axis=1)
+    # La fuente llega antes a los microfonos que estan mas cerca de ella
+    return -np.dot(direcciones, posiciones.T) / VELOCIDAD_SONIDO * frecuencia
+
+
+def gccPhat(espectroA, espectroB, maxRetardo, peso=1.0):
+    """
+    Correlacion cruzada generalizada con transformada de fase (GCC-PHAT) a partir de los espectros
+    de dos senales, el peso permite ignorar las frecuencias dominadas por el ruido
+
+    Retorna la correlacion para los retardos -maxRetardo..maxRetardo, el valor en el retardo k
+    es alto si la senal a llega k muestras despues que b
+    """
+    cruzado = espectroA * np.conj(espectroB)
+    cruzado = cruzado / (np.abs(cruzado) + 1e-12) * peso
+    correlacion = np.fft.irfft(cruzado, 2 * (len(cruzado) - 1))
+    return np.concatenate((correlacion[-maxRetardo:], correlacion[:maxRetardo + 1]))
+
+
+class Beamformer():
+    """
+    Clase que combina los cuatro canales del NAO en un solo canal mejorado
+    ...
+    Atributos
+    ----------
+    frecuencia : int
+        Frecuencia de muestreo de los cuatro canales, ALAudioDevice usa 48000 Hz para todos los canales
+    umbral : float
+        Energia minima de un bloque para actualizar la direccion, evita seguir al ruido en los silencios
+    ruido : float
+        Estimacion del piso de ruido, la direccion solo se actualiza en bloques que lo superan con claridad
+    espectroRuido : array
+        Espectro promedio de los bloques sin voz, las frecuencias dominadas por el ruido pesan menos al estimar la direccion
+    potencia : array
+        Potencia SRP-PHAT acumulada de cada direccion candidata, suavizada entre bloques con voz
+    azimut : float
+        Direccion estimada del usuario en radianes, 0 es al frente del robot y pi/2 a su izquierda
+    retardos : array
+        Retardos de cada direccion candidata, en muestras
+    historial : array
+        Ultimas muestras del bloque anterior, para alinear canales entre bloques
+
+    Metodos
+    -------
+    estimarDireccion(espectros, peso)
+        Potencia SRP-PHAT de un bloque para cada direccion candidata
+    procesar(canales)
+        Procesa un bloque (muestras, 4) y retorna el canal mejorado
+    procesarBytes(datos)
+        Igual que procesar pero con bytes PCM de 16 bits intercalados, como los entrega ALAudioDevice
+    """
+    def __init__(self, frecuencia=48000, umbral=300.0, posiciones=POSICIONES):
+        self.frecuencia = frecuencia
+        self.umbral = umbral
+        self.canales = len(posiciones)
+        self.indice = 0
+        self.azimut = AZIMUTS[self.indice]
+        self.retardos = retardosDireccion(AZIMUTS, frecuencia, posiciones)
+
+        # Retardo maximo posible entre dos microfonos
+        distancia = max([np.linalg.norm(posiciones[i] - posiciones[j])
+                         for i in range(self.canales) for j in range(self.canales)])
+        self.maxRetardo = int(np.ceil(distancia / VELOCIDAD_SONIDO * frecuencia)) + 1
+
+        # Retardo esperado de cada par de microfonos para cada direccion candidata
+        self.pares = [(i, j) for i in range(self.canales) for j in range(i + 1, self.canales)]
+        self.indicesPares = np.stack([np.rint(self.retardos[:, i] - self.retardos[:, j]).astype(int) + self.maxRetardo
+                                      for (i, j) in self.pares], axis=1)
+
+        self.historial = np.zeros((self.maxRetardo, self.canales))
+        self.ruido = None
+        self.espectroRuido = None
+        self.potencia = np.zeros(len(AZIMUTS))
+
+    def estimarDireccion(self, espectros, peso):
+        potencia = np.zeros(len(AZIMUTS))
+        for k, (i, j) in enumerate(self.pares):
+            correlacion = gccPhat(espectros[:, i], espectros[:, j], self.maxRetardo, peso)
+            potencia += correlacion[self.indicesPares[:, k]]
+        return potencia
+
+    def procesar(self, canales):
+        canales = np.asarray(canales, dtype=np.float64)
+
+        ## Solo se actualiza la direccion si el bloque tiene voz: supera el umbral y el piso de ruido
+        energia = np.sqrt(np.mean(canales ** 2))
+        if self.ruido == None:
+            self.ruido = energia
+        self.ruido = min(energia, self.ruido * 1.02)
+        vozPresente = energia > self.umbral and energia > 1.25 * self.ruido
+
+        # Espectros de todos los canales en una sola llamada, con relleno para evitar la correlacion circular
+        n = 1
+        while n < 2 * len(canales):
+            n *= 2
+        espectros = np.fft.rfft(canales, n, axis=0)
+        densidad = np.mean(np.abs(espectros) ** 2, axis=1)
+        mismoTamano = self.espectroRuido is not None and len(self.espectroRuido) == len(densidad)
+
+        if vozPresente:
+            peso = 1.0
+            if mismoTamano:
+                peso = np.clip(1 - SOBRESTIMACION_RUIDO * self.espectroRuido / (densidad + 1e-12), 0, 1)
+            self.potencia = 0.7 * self.potencia + self.estimarDireccion(espectros, peso)
+            self.indice = np.argmax(self.potencia)
+            self.azimut = AZIMUTS[self.indice]
+        elif mismoTamano:
+            self.espectroRuido = 0.9 * self.espectroRuido + 0.1 * densidad
+        else:
+            self.espectroRuido = densidad
+
+        ## Delay-and-sum: se adelantan los canales a los que la voz llega despues
+        retardos = self.retardos[self.indice]
+        desplazamientos = np.rint(retardos - retardos.min()).astype(int)
+        senal = np.vstack((self.historial, canales))
+        n = len(canales)
+        salida = np.zeros(n)
+        for i in range(self.canales):
+            salida += senal[desplazamientos[i]:desplazamientos[i] + n, i]
+        self.historial = senal[-self.maxRetardo:]
+        return salida / self.canales
+
+    def procesarBytes(self, datos):
+        canales = np.frombuffer(datos, dtype=np.int16).reshape(-1, self.canales)
+        return np.clip(self.procesar(canales), -32768, 32767).astype(np.int16)
+
+
+class Decimador():
+    """
+    Filtro paso bajo y reduccion de la frecuencia de muestreo por un factor entero, por bloques
+    Se usa para pasar de los 48000 Hz de los cuatro canales a los 16000 Hz del SR
+    ...
+    Metodos
+    -------
+    procesar(muestras)
+        Filtra y reduce un bloque, conserva el estado para el bloque siguiente
+    """
+    def __init__(self, factor=3, coeficientes=48):
+        self.factor = factor
+        # Filtro sinc con ventana de Hamming, corte un poco por debajo de la nueva frecuencia de Nyquist
+        t = np.arange(coeficientes) - (coeficientes - 1) / 2.0
+        self.filtro = np.sinc(0.9 * t / factor) * np.hamming(coeficientes) * 0.9 / factor
+        self.estado = np.zeros(coeficientes - 1)
+        self.fase = 0
+
+    def procesar(self, muestras):
+        senal = np.concatenate((self.estado, muestras))
+        filtrada = np.convolve(senal, self.filtro, 'valid')
+        salida = filtrada[self.fase::self.factor]
+        self.fase = (self.fase - len(filtrada)) % self.factor
+        self.estado = senal[-(len(self.filtro) - 1):]
+        return salida
+
+
+def aBytes(muestras):
+    """
+    Convierte muestras flotantes a bytes PCM de 16 bits, como los espera el reconocedor
+    """
+    return np.clip(muestras, -32768, 32767).astype(np.int16).tobytes()
+
+
+def procesarDatos(datos, frecuencia, bloque=4096, frecuenciaSalida=16000):
+    """
+    Aplica el beamformer y la reduccion de frecuencia a audio de cuatro canales intercalado,
+    por bloques como en vivo
+
+    Parametros
+    ----------
+    datos : bytes
+        PCM de 16 bits con los cuatro canales intercalados
+    frecuencia : int
+        Frecuencia de los datos, debe ser multiplo de frecuenciaSalida
+    bloque : int
+        Muestras por canal de cada bloque
+    frecuenciaSalida : int
+        Frecuencia del audio mono resultante
+
+    Retorna (mono, azimut) con los bytes PCM mono y el azimut final estimado, en grados
+    """
+    beamformer = Beamformer(frecuencia)
+    decimador = Decimador(frecuencia // frecuenciaSalida)
+    tamano = bloque * beamformer.canales * 2
+    partes = [decimador.procesar(beamformer.procesarBytes(datos[inicio:inicio + tamano]).astype(np.float64))
+              for inicio in range(0, len(datos), tamano)]
+    mono = aBytes(np.concatenate(partes) if len(partes) > 0 else np.zeros(0))
+    return mono, np.degrees(beamformer.azimut)
+
+
+def procesarArchivo(entrada, salida, bloque=4096, frecuenciaSalida=16000):
+    """
+    Aplica el beamformer a una grabacion de cuatro canales del NAO y guarda el resultado en mono
+
+    Parametros
+    ----------
+    entrada : str
+        Archivo WAV de cuatro canales, por ejemplo el rec.wav del Plan B
+    salida : str
+        Archivo WAV mono de salida
+    bloque : int
+        Muestras por canal de cada bloque, igual que al procesar en vivo
+    frecuenciaSalida : int
+        Frecuencia del archivo de salida, debe dividir a la de entrada
+
+    Retorna el azimut final estimado, en grados
+    """
+    archivo = wave.open(entrada, 'rb')
+    try:
+        frecuencia = archivo.getframerate()
+        datos = archivo.readframes(archivo.getnframes())
+    finally:
+        archivo.close()
+
+    mono, azimut = procesarDatos(datos, frecuencia, bloque, frecuenciaSalida)
+    archivo = wave.open(salida, 'wb')
+    try:
+        archivo.setnchannels(1)
+        archivo.setsampwidth(2)
+        archivo.setframerate(frecuenciaSalida)
+        archivo.writeframes(mono)
+    finally:
+        archivo.close()
+    return azimut
@@ -0,0 +1,171 @@
+# -*- encoding: UTF-8 -*-
+"""
+Benchmark del beamformer
+    Sintetico: genera grabaciones ruidosas de cuatro canales con la geometria del NAO,
+    y mide la mejora de la relacion señal a ruido, el error de direccion y el costo de CPU
+    Grabaciones reales: con --reconocer DIRECTORIO transcribe cada WAV de cuatro canales
+    con el microfono frontal y con el beamformer, y compara la tasa de exito del SR
+
+Uso:
+    python bench_beamformer.py
+    python bench_beamformer.py --reconocer grabaciones/
+"""
+
+# Librerias principales
+import numpy as np
+from beamformer import Beamformer, Decimador, POSICIONES, AZIMUTS, retardosDireccion, procesarArchivo
+
+# Librerías auxiliares
+import argparse
+import glob
+import os
+import tempfile
+import time
+import wave
+
+try:
+    reloj = time.process_time   # Python 3, solo tiempo de CPU
+except AttributeError:
+    reloj = time.clock          # Python 2.7
+
+FRECUENCIA = 48000
+BLOQUE = 4096
+CANAL_FRONTAL = 2
+
+
+def desplazar(senal, retardo):
+    # Retardo fraccionario aplicado en frecuencia
+    n = len(senal)
+    frecuencias = np.fft.rfftfreq(n)
+    return np.fft.irfft(np.fft.rfft(senal) * np.exp(-2j * np.pi * frecuencias * retardo), n)
+
+
+def fuente(segundos, semilla):
+    # Señal tipo voz: armonicos con tono variable, modulados a ritmo de silabas
+    generador = np.random.RandomState(semilla)
+    t = np.arange(int(segundos * FRECUENCIA)) / float(FRECUENCIA)
+    tono = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    fase = 2 * np.pi * np.cumsum(tono) / FRECUENCIA
+    voz = sum([np.sin(k * fase) / k for k in range(1, 20)])
+    silabas = np.clip(np.sin(2 * np.pi * 4 * t + generador.rand() * 6), 0, None)
+    return voz * silabas
+
+
+def llegada(senal, azimut):
+    # Copia de la señal en cada microfono segun la direccion de llegada
+    retardos = retardosDireccion(np.array([azimut]), FRECUENCIA)[0]
+    return np.stack([desplazar(senal, retardos[i]) for i in range(len(POSICIONES))], axis=1)
+
+
+def escenario(segundos, azimutVoz, azimutRuido, snr, semilla):
+    generador = np.random.RandomState(semilla)
+    voz = llegada(fuente(segundos, semilla), azimutVoz)
+    interferencia = llegada(generador.randn(voz.shape[0]), azimutRuido)
+    difuso = generador.randn(*voz.shape)
+    # Ruido de sala: difuso (independiente en cada microfono) mas una fuente puntual mas debil
+    ruido = difuso + 0.5 * interferencia
+    # Se escala el ruido para obtener la SNR pedida en el microfono frontal
+    voz = voz * 3000 / np.abs(voz).max()
+    ruido = ruido * np.sqrt(np.mean(voz[:, CANAL_FRONTAL] ** 2) / np.mean(ruido[:, CANAL_FRONTAL] ** 2) / 10 ** (snr / 10.0))
+    return voz, ruido
+
+
+def porBloques(beamformer, canales):
+    return np.concatenate([beamformer.procesar(canales[i:i + BLOQUE]) for i in range(0, len(canales), BLOQUE)])
+
+
+def snrDb(voz, ruido):
+    return 10 * np.log10(np.mean(voz ** 2) / np.mean(ruido ** 2))
+
+
+def sintetico(turnos, segundos, snr):
+    print("Escenario sintetico: %d turnos de %.1fs, SNR de entrada %.0f dB" % (turnos, segundos, snr))
+    mejoras = []
+    errores = []
+    tiempos = []
+    for turno in range(turnos):
+        azimutVoz = AZIMUTS[(turno * 7) % len(AZIMUTS)]
+        azimutRuido = azimutVoz + np.pi * 0.75
+        voz, ruido = escenario(segundos, azimutVoz, azimutRuido, snr, turno)
+
+        ## Costo de CPU del procesamiento en vivo: beamformer y decimador por bloques
+        beamformer = Beamformer(FRECUENCIA)
+        decimador = Decimador(3)
+        inicio = reloj()
+        for i in range(0, len(voz), BLOQUE):
+            decimador.procesar(beamformer.procesar(voz[i:i + BLOQUE] + ruido[i:i + BLOQUE]))
+        tiempos.append(reloj() - inicio)
+
+        diferencia = np.angle(np.exp(1j * (beamformer.azimut - azimutVoz)))
+        errores.append(abs(np.degrees(diferencia)))
+
+        ## Mejora de SNR: se aplica el haz final por separado a la voz y al ruido
+        fijo = Beamformer(FRECUENCIA, umbral=np.inf)
+        fijo.indice = beamformer.indice
+        salidaVoz = porBloques(fijo, voz)
+        fijo.historial[:] = 0
+        salidaRuido = porBloques(fijo, ruido)
+        mejoras.append(snrDb(salidaVoz, salidaRuido) - snrDb(voz[:, CANAL_FRONTAL], ruido[:, CANAL_FRONTAL]))
+
+    print("  Mejora de SNR sobre el microfono frontal: %.1f dB (min %.1f)" % (np.mean(mejoras), np.min(mejoras)))
+    print("  Error de direccion: %.1f grados en promedio" % np.mean(errores))
+    print("  CPU por turno: %.1f ms (%.2f ms por segundo de audio)"
+          % (1000 * np.mean(tiempos), 1000 * np.mean(tiempos) / segundos))
+
+
+def reconocer(directorio):
+    import speech_recognition as sr
+    recognizer = sr.Recognizer("es-CR")
+    archivos = sorted(glob.glob(os.path.join(directorio, "*.wav")))
+    exitos = {'frontal': 0, 'beamformer': 0}
+    tiempos = []
+    temporal = tempfile.mkdtemp()
+
+    for ruta in archivos:
+        ## Canal frontal solo, como referencia
+        archivo = wave.open(ruta, 'rb')
+        frecuencia = archivo.getframerate()
+        canales = np.frombuffer(archivo.readframes(archivo.getnframes()), dtype=np.int16).reshape(-1, archivo.getnchannels())
+        archivo.close()
+        frontal = os.path.join(temporal, "frontal.wav")
+        archivo = wave.open(frontal, 'wb')
+        archivo.setnchannels(1)
+        archivo.setsampwidth(2)
+        archivo.setframerate(frecuencia)
+        archivo.writeframes(np.ascontiguousarray(canales[:, CANAL_FRONTAL]).tobytes())
+        archivo.close()
+
+        mejorado = os.path.join(temporal, "beamformer.wav")
+        inicio = reloj()
+        procesarArchivo(ruta, mejorado)
+        tiempos.append(reloj() - inicio)
+
+        for nombre, camino in [('frontal', frontal), ('beamformer', mejorado)]:
+            with sr.WavFile(camino) as source:
+                audio = recognizer.record(source)
+            try:
+                print("%s (%s): %s" % (os.path.basename(ruta), nombre, recognizer.recognize(audio)))
+                exitos[nombre] += 1
+            except LookupError:
+                print("%s (%s): No fue posible transcribir el audio" % (os.path.basename(ruta), nombre))
+
+    total = max(len(archivos), 1)
+    print("Grabaciones: %d" % len(archivos))
+    print("  Exito del SR con microfono frontal: %.0f%%" % (100.0 * exitos['frontal'] / total))
+    print("  Exito del SR con beamformer: %.0f%%" % (100.0 * exitos['beamformer'] / total))
+    if len(tiempos) > 0:
+        print("  CPU del beamformer por grabacion: %.1f ms" % (1000 * np.mean(tiempos)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del beamformer de cuatro canales")
+    parser.add_argument("--turnos", type=int, default=20, help="Turnos sinteticos")
+    parser.add_argument("--segundos", type=float, default=4.0, help="Duracion de cada turno sintetico")
+    parser.add_argument("--snr", type=float, default=0.0, help="SNR de entrada en dB")
+    parser.add_argument("--reconocer", metavar="DIRECTORIO", help="Directorio con grabaciones WAV de cuatro canales")
+    argumentos = parser.parse_args()
+
+    if argumentos.reconocer:
+        reconocer(argumentos.reconocer)
+    else:
+        sintetico(argumentos.turnos, argumentos.segundos, argumentos.snr)
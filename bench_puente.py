@@ -0,0 +1,113 @@
+# -*- encoding: UTF-8 -*-
+"""
+Benchmark del puente entre procesos
+    Inicia un proceso de eco, con el mismo u otro interprete (por ejemplo Python 2.7,
+    como control_nao.py), y mide el tiempo de ida y vuelta:
+        Por orden: una solicitud con su respuesta, como 'nao.efectos.estado'
+        Por bloque de audio: escribir un bloque de cuatro canales en la memoria compartida,
+        avisar su posicion, que el otro proceso lo lea y confirme
+
+Uso:
+    python3 bench_puente.py
+    python3 bench_puente.py --interprete python2.7
+"""
+
+# Librerias principales
+from puente import Puente, AnilloAudio, escuchar, conectar, DIRECTORIO_COMPARTIDO # Puente entre procesos
+
+# Librerías auxiliares
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+MUESTRAS = 4096     # Muestras por canal de cada bloque, como los entrega ALAudioDevice
+CANALES = 4
+FRECUENCIA = 48000
+
+
+def percentiles(tiempos):
+    tiempos = sorted(tiempos)
+    return (1e6 * tiempos[len(tiempos) // 2], 1e6 * tiempos[int(0.95 * len(tiempos))],
+            1e6 * sum(tiempos) / len(tiempos))
+
+
+def eco(rutaSocket, rutaAnillo):
+    # Proceso de eco: responde las solicitudes y confirma cada bloque de audio que lee
+    puente = Puente(conectar(rutaSocket), {'eco': lambda *argumentos: list(argumentos)})
+    anillo = AnilloAudio(rutaAnillo)
+
+    def recibir(posicion, largo, canales):
+        datos = anillo.leer(posicion, largo)
+        puente.notificar('recibido', -1 if datos == None else len(datos))
+    puente.alAudio = recibir
+    puente.cerrado.wait()
+    puente.cerrar()
+    anillo.cerrar()
+
+
+def medir(interprete, comandos, bloques):
+    directorio = tempfile.mkdtemp()
+    rutaSocket = os.path.join(directorio, "bench.sock")
+    rutaAnillo = os.path.join(DIRECTORIO_COMPARTIDO, "bench_audio_%d" % os.getpid())
+    anillo = AnilloAudio(rutaAnillo, crear=True)
+    proceso = subprocess.Popen([interprete, os.path.abspath(__file__), "--eco", rutaSocket, rutaAnillo])
+
+    recibido = threading.Event()
+    confirmados = []
+
+    def confirmar(largo):
+        confirmados.append(largo)
+        recibido.set()
+    puente = Puente(escuchar(rutaSocket), {'recibido': confirmar})
+    version = subprocess.check_output([interprete, "-c", "import sys; print(sys.version.split()[0])"]).strip()
+    print("Proceso de eco: %s (Python %s)" % (interprete, version.decode('ascii')))
+
+    ## Ordenes: solicitud y respuesta
+    for i in range(100):
+        puente.llamar('eco', 'pensando')
+    tiempos = []
+    for i in range(comandos):
+        inicio = time.time()
+        puente.llamar('eco', 'nao.efectos.estado', 'pensando')
+        tiempos.append(time.time() - inicio)
+    p50, p95, promedio = percentiles(tiempos)
+    print("Orden, ida y vuelta (%d): p50 %.0f us, p95 %.0f us, promedio %.0f us" % (comandos, p50, p95, promedio))
+
+    ## Audio: bloque en memoria compartida, aviso de su posicion y confirmacion
+    bloque = os.urandom(MUESTRAS * CANALES * 2)
+    tiempos = []
+    for i in range(bloques):
+        recibido.clear()
+        inicio = time.time()
+        posicion = anillo.escribir(bloque)
+        puente.enviarAudio(posicion, len(bloque), CANALES)
+        recibido.wait()
+        tiempos.append(time.time() - inicio)
+    p50, p95, promedio = percentiles(tiempos)
+    duracion = float(MUESTRAS) / FRECUENCIA
+    print("Bloque de audio de %d KiB (%.0f ms), ida y vuelta (%d): p50 %.0f us, p95 %.0f us, promedio %.0f us"
+          % (len(bloque) // 1024, 1000 * duracion, bloques, p50, p95, promedio))
+    print("  Costo del puente: %.2f%% de la duracion del audio, %d bloques sobrescritos"
+          % (100 * promedio / 1e6 / duracion, confirmados.count(-1)))
+
+    puente.cerrar()
+    proceso.wait()
+    anillo.cerrar(borrar=True)
+    os.rmdir(directorio)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--eco":
+        eco(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Benchmark del puente entre procesos")
+    parser.add_argument("--interprete", default=sys.executable, help="Interprete del proceso de eco, por ejemplo python2.7")
+    parser.add_argument("--comandos", type=int, default=5000, help="Ordenes a medir")
+    parser.add_argument("--bloques", type=int, default=1000, help="Bloques de audio a medir")
+    argumentos = parser.parse_args()
+    medir(argumentos.interprete, argumentos.comandos, argumentos.bloques)
@@ -0,0 +1,236 @@
+# -*- encoding: UTF-8 -*-
+"""
+# Librerías importadas
+## Por favor instalar las siguientes por medio de pip (Python 3)
+----------------------------------------
+pip install SpeechRecognition==2.2.0
+pip install openai==0.2.0
+pip install numpy
+----------------------------------------
+
+Proceso de IA y audio (Python 3)
+    Ejecuta la conversacion, el SR incremental, el beamformer y la IA sin la SDK de NAOqi
+    El robot se controla por puente.py desde control_nao.py (Python 2.7): cada llamado
+    al robot se reenvia por el socket y el audio crudo se lee de la memoria compartida
+    Asi el procesamiento de audio y la IA no comparten el GIL con los eventos de NAOqi
+
+Uso:
+    python control_nao.py     (Python 2.7, primero)
+    python3 cerebro.py
+"""
+
+# Librerias principales
+import speech_recognition as sr     # Reconocimiento de voz
+from beamformer import Beamformer, Decimador, aBytes # Beamforming de los cuatro microfonos
+from planificador import Planificador # Limites de tiempo por turno
+from reconocimiento import ReconocedorIncremental, FuenteAudio # SR por segmentos mientras se habla
+from conversacion import Conversacion # Acciones de cada estado
+from ia import IA, CONTEXTO         # Conexion con GPT, con control de consumo, y contexto de NAO
+from enrutador import Enrutador     # Motor y tokens por nivel de pregunta
+from puente import Puente, AnilloAudio, conectar, RUTA_SOCKET, RUTA_AUDIO # Puente con control_nao.py
+
+# Librerías auxiliares
+import argparse
+import math
+import queue
+import threading
+import time
+
+
+class Remoto():
+    """
+    Objeto del proceso de control: cada metodo que se llama se ejecuta alla por el puente
+    Por ejemplo Remoto(puente, 'nao').efectos.estado('error') llama 'nao.efectos.estado'
+    """
+    def __init__(self, puente, ruta):
+        self.puente = puente
+        self.ruta = ruta
+
+    def __getattr__(self, nombre):
+        return Remoto(self.puente, self.ruta + '.' + nombre)
+
+    def __call__(self, *argumentos):
+        return self.puente.llamar(self.ruta, *argumentos)
+
+
+class NAORemoto(Remoto):
+    """
+    Robot del proceso de control, con los mismos metodos que NAO
+    Los toques se guardan aqui, los actualiza la conversacion con los avisos del puente
+    """
+    def __init__(self, puente):
+        Remoto.__init__(self, puente, 'nao')
+        self.headTouched = False
+        self.handTouched = False
+
+    def pensar(self):
+        # La frase de relleno no debe consumir el tiempo del turno, se envia sin esperar
+        self.puente.notificar('nao.pensar')
+
+    def generar(self, texto, generador):
+        return generador(texto).strip()
+
+
+class SRRemoto(Remoto):
+    """
+    SR de palabras clave del proceso de control, con los mismos metodos que SpeechTestClass
+    Las palabras reconocidas llegan como avisos del puente
+    """
+    def __init__(self, puente, nombre):
+        Remoto.__init__(self, puente, nombre)
+        self.isWordSaid = False
+        self.lastWords = None
+        self.alReconocer = None
+
+    def armar(self):
+        self.isWordSaid = False
+        self.lastWords = None
+        self.puente.llamar(self.ruta + '.armar')
+
+    def desarmar(self):
+        self.puente.llamar(self.ruta + '.desarmar')
+
+    def reconocer(self, palabras):
+        self.lastWords = palabras
+        self.isWordSaid = True
+        if self.alReconocer != None:
+            self.alReconocer()
+
+    def isSearchedWordSaid(self):
+        return self.isWordSaid
+
+    def getWords(self):
+        return self.lastWords
+
+
+class ReceptorRemoto():
+    """
+    Recibe el audio crudo de los cuatro microfonos desde la memoria compartida,
+    lo combina con el beamformer, lo reduce a 16 kHz y lo pasa al reconocedor incremental
+    El hilo del puente solo copia cada bloque del anillo, el procesamiento corre en un hilo de audio
+    propio para que las respuestas del puente no esperen detras del beamformer
+    Tiene los mismos metodos que ReceptorAudio
+    """
+    FRECUENCIA = 16000
+    FRECUENCIA_CANALES = 48000
+
+    def __init__(self, puente, anillo, reconocedor):
+        self.puente = puente
+        self.anillo = anillo
+        self.reconocedor = reconocedor
+        self.beamformer = Beamformer(self.FRECUENCIA_CANALES)
+        self.decimador = None
+        self.finVoz = None
+        self.tiempoBeamformer = 0.0
+        self.bloques = queue.Queue()
+        hilo = threading.Thread(target=self.procesar)
+        hilo.daemon = True
+        hilo.start()
+
+    def iniciar(self):
+        self.reconocedor.iniciar()
+        self.decimador = Decimador(self.FRECUENCIA_CANALES // self.FRECUENCIA)
+        self.beamformer.historial[:] = 0
+        self.tiempoBeamformer = 0.0
+        self.puente.llamar('receptor.iniciar')
+
+    def detener(self):
+        # La respuesta llega despues de todos los bloques enviados antes de cancelar la suscripcion,
+        # luego se espera a que el hilo de audio termine de procesarlos
+        self.puente.llamar('receptor.detener')
+        self.finVoz = time.time()
+        self.bloques.join()
+
+    def recibir(self, posicion, largo, canales):
+        # Hilo del puente: se copia el bloque antes de que se sobrescriba y se deja en la cola
+        datos = self.anillo.leer(posicion, largo)
+        if datos == None:
+            print("Bloque de audio sobrescrito antes de leerlo")
+            return
+        self.bloques.put((datos, canales))
+
+    def procesar(self):
+        # Hilo de audio: procesa los bloques en el orden en que llegaron
+        while True:
+            datos, canales = self.bloques.get()
+            try:
+                if canales > 1:
+                    inicio = time.time()
+                    mono = self.decimador.procesar(self.beamformer.procesarBytes(datos))
+                    self.tiempoBeamformer += time.time() - inicio
+                    self.reconocedor.agregar(aBytes(mono))
+                else:
+                    self.reconocedor.agregar(datos)
+            except Exception as e:
+                print("Error al procesar el bloque de audio: " + str(e))
+            finally:
+                self.bloques.task_done()
+
+    def transcribir(self):
+        print("Beamformer: %.0f ms en el turno, direccion %.0f grados"
+              % (self.tiempoBeamformer * 1000, math.degrees(self.beamformer.azimut)))
+        texto = self.reconocedor.finalizar()
+        print("Texto final %.2fs despues del fin de la voz" % (time.time() - self.finVoz))
+        return texto
+
+
+"""
+Codigo principal
+MAIN
+
+Se conecta con control_nao.py, se crean la IA, el SR y los objetos remotos del robot
+y se atienden conversaciones hasta que se diga 'apagar'
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Proceso de IA y audio, se comunica con control_nao.py")
+    parser.add_argument("--socket", default=RUTA_SOCKET, help="Socket Unix del puente")
+    argumentos = parser.parse_args()
+
+    puente = Puente(conectar(argumentos.socket))
+    anillo = AnilloAudio(RUTA_AUDIO)
+
+    ###Inicializar clases
+    nao = NAORemoto(puente)
+    inicio = SRRemoto(puente, 'inicio')
+    fin = SRRemoto(puente, 'fin')
+    ia = IA(CONTEXTO, enrutador=Enrutador())
+    planificador = Planificador(ia.generar, nao.pensar, registrar=ia.recordar)
+    recognizer = sr.Recognizer("es-CR")
+    recognizer.pause_threshold = 1.5
+    receptor = ReceptorRemoto(puente, anillo, ReconocedorIncremental(recognizer, FuenteAudio(ReceptorRemoto.FRECUENCIA)))
+    conversacion = Conversacion(nao, planificador, inicio, fin, receptor)
+
+    # Avisos del proceso de control
+    puente.objetos.update({
+        'cabeza': conversacion.tocarCabeza,
+        'mano': conversacion.tocarMano,
+        'estadoSR': conversacion.cambiarEstadoSR,
+        'palabra': lambda nombre, palabras: {'inicio': inicio, 'fin': fin}[nombre].reconocer(palabras),
+    })
+    puente.alAudio = receptor.recibir
+
+    hilo = threading.Thread(target=conversacion.correr)
+    hilo.daemon = True
+    hilo.start()
+    try:
+        while hilo.is_alive() and not puente.cerrado.is_set():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("Interrumpido")
+
+    # Fin del proceso, al cerrar el puente termina tambien control_nao.py
+    try:
+        nao.efectos.estado('apagado')
+    except (EOFError, RuntimeError):
+        pass
+    puente.cerrar()
+    anillo.cerrar()
+    print(planificador.resumen())
+    print(ia.contabilidad.resumen())
+    print(ia.enrutador.resumen())
+    print("CEREBRO FINALIZADO")
+
+
+if __name__ == "__main__":
+    main()
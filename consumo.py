@@ -0,0 +1,138 @@
+# -*- encoding: UTF-8 -*-
+"""
+Contabilidad de consumo y control de admision para el API de OpenAI
+    CubetaTokens limita las solicitudes y tokens por minuto con el algoritmo de cubeta de tokens
+    Contabilidad lleva los tokens de entrada y salida por turno, por sesion y por hora,
+    para planificar la capacidad de un dia completo de evento
+"""
+
+# Librerías auxiliares
+import threading
+import time
+
+
+class CubetaTokens():
+    """
+    Cubeta de tokens: se llena a una tasa constante hasta su capacidad, cada uso la vacia
+    ...
+    Atributos
+    ----------
+    capacidad : float
+        Cantidad maxima de tokens acumulados, permite rafagas cortas
+    tasa : float
+        Tokens que se agregan por segundo
+    disponibles : float
+        Tokens disponibles en este momento
+
+    Metodos
+    -------
+    tomar(cantidad, esperaMaxima=0)
+        Toma tokens de la cubeta, espera hasta esperaMaxima segundos si no alcanzan, con None espera lo necesario
+        Retorna True si se tomaron, False si se agoto la espera
+    devolver(cantidad)
+        Regresa tokens a la cubeta, por ejemplo si el uso real fue menor al estimado
+    """
+    def __init__(self, porMinuto, capacidad=None):
+        self.tasa = porMinuto / 60.0
+        self.capacidad = float(capacidad if capacidad != None else porMinuto)
+        self.disponibles = self.capacidad
+        self.ultimo = time.time()
+        self.candado = threading.Lock()
+
+    def rellenar(self):
+        ahora = time.time()
+        self.disponibles = min(self.capacidad, self.disponibles + (ahora - self.ultimo) * self.tasa)
+        self.ultimo = ahora
+
+    def tomar(self, cantidad, esperaMaxima=0):
+        cantidad = min(cantidad, self.capacidad)
+        limite = time.time() + esperaMaxima if esperaMaxima != None else None
+        while True:
+            with self.candado:
+                self.rellenar()
+                if self.disponibles >= cantidad:
+                    self.disponibles -= cantidad
+                    return True
+                espera = (cantidad - self.disponibles) / self.tasa
+            if limite != None and time.time() + espera > limite:
+                return False
+            time.sleep(espera)
+
+    def devolver(self, cantidad):
+        with self.candado:
+            self.rellenar()
+            self.disponibles = min(self.capacidad, self.disponibles + cantidad)
+
+
+class Contabilidad():
+    """
+    Contadores de uso del API por turno, por sesion y por hora
+    ...
+    Atributos
+    ----------
+    ultimoTurno : tuple
+        Tokens (entrada, salida) de la ultima solicitud
+    sesion : dict
+        Totales de la sesion: solicitudes, tokens de entrada y salida, rechazos y limites del API (429)
+    porHora : dict
+        Totales por hora, la llave es la hora en formato 'AAAA-MM-DD HH'
+
+    Metodos
+    -------
+    registrar(entrada, salida)
+        Registra los tokens de una solicitud exitosa
+    rechazo()
+        Registra una solicitud descartada por el control de admision
+    limiteApi()
+        Registra una respuesta 429 del API
+    resumen()
+        Devuelve un texto con los totales de la sesion y por hora
+    """
+    def __init__(self):
+        self.candado = threading.Lock()
+        self.ultimoTurno = (0, 0)
+        self.sesion = {'solicitudes': 0, 'entrada': 0, 'salida': 0, 'rechazos': 0, 'limites': 0}
+        self.porHora = {}
+
+    def hora(self):
+        llave = time.strftime("%Y-%m-%d %H")
+        if llave not in self.porHora:
+            self.porHora[llave] = {'solicitudes': 0, 'entrada': 0, 'salida': 0, 'rechazos': 0, 'limites': 0}
+        return self.porHora[llave]
+
+    def sumar(self, campo, cantidad=1):
+        self.sesion[campo] += cantidad
+        self.hora()[campo] += cantidad
+
+    def registrar(self, entrada, salida):
+        with self.candado:
+            self.ultimoTurno = (entrada, salida)
+            self.sumar('solicitudes')
+            self.sumar('entrada', entrada)
+            self.sumar('salida', salida)
+        print("Tokens turno: %d + %d, sesion: %d en %d solicitudes"
+              % (entrada, salida, self.sesion['entrada'] + self.sesion['salida'], self.sesion['solicitudes']))
+
+    def rechazo(self):
+        with self.candado:
+            self.sumar('rechazos')
+
+    def limiteApi(self):
+        with self.candado:
+            self.sumar('limites')
+
+    def resumen(self):
+        with self.candado:
+            solicitudes = self.sesion['solicitudes']
+            lineas = ["Consumo IA: %d solicitudes, %d tokens de entrada, %d de salida, %d rechazadas, %d limitadas por el API"
+                      % (solicitudes, self.sesion['entrada'], self.sesion['salida'],
+                         self.sesion['rechazos'], self.sesion['limites'])]
+            if solicitudes > 0:
+                lineas.append("  Promedio por turno: %.0f tokens"
+                              % (float(self.sesion['entrada'] + self.sesion['salida']) / solicitudes))
+            for llave in sorted(self.porHora.keys()):
+                hora = self.porHora[llave]
+                lineas.append("  %s: %d solicitudes, %d tokens, %d rechazadas, %d limitadas"
+                              % (llave, hora['solicitudes'], hora['entrada'] + hora['salida'],
+                                 hora['rechazos'], hora['limites']))
+        return "\n".join(lineas)
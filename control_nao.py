@@ -0,0 +1,231 @@
+# -*- encoding: UTF-8 -*-
+"""
+Proceso de control del NAO (Python 2.7)
+    Solo contiene los proxies y eventos de NAOqi: el robot, los SR de palabras clave,
+    los sensores tactiles y la captura de audio
+    El SR incremental, el beamformer y la IA corren en cerebro.py con Python 3, los dos
+    procesos se comunican por puente.py:
+        cerebro.py llama los metodos del robot ('nao.saludo', 'inicio.armar', ...)
+        este proceso avisa de toques, palabras y estado del SR, y escribe el audio crudo
+        de los cuatro microfonos en la memoria compartida
+    Solo requiere la SDK de NAOqi: el robot y los SR de palabras clave vienen de robot.py,
+    sin SpeechRecognition ni openai
+
+Uso:
+    python control_nao.py [--ip IP --puerto PUERTO]     (Python 2.7 con la SDK de NAOqi)
+    python3 cerebro.py
+Sin robot:
+    python control_nao.py --simular [--audio pregunta.wav]
+"""
+
+# Librerías auxiliares
+import argparse
+import sys
+import time
+
+# Con --simular el modulo naoqi se reemplaza antes de importar robot.py
+if __name__ == "__main__" and "--simular" in sys.argv:
+    import naoqi_falso
+    sys.modules['naoqi'] = naoqi_falso
+
+# Librerias principales
+from naoqi import ALBroker, ALModule    # Clases de Naoqi v2.1.4.13
+from puente import Puente, AnilloAudio, escuchar, RUTA_SOCKET, RUTA_AUDIO # Puente con el proceso de IA
+from conversacion import EVENTOS_CABEZA, EVENTOS_MANOS, EVENTO_ESTADO_SR # Eventos de NAOqi de la conversacion
+from robot import NAO, SpeechTestClass, IP, PORT, PALABRAS_INICIO, PALABRAS_FIN # Robot y SR de palabras clave, solo NAOqi
+
+
+"""
+Clase ControlNao que hereda de ALModule.
+    Reenvia al proceso de IA los eventos del robot
+"""
+class ControlNao(ALModule):
+    """
+    Modulo de NAOqi que reenvia los toques y el estado del SR por el puente
+    ...
+    Atributos
+    ----------
+    memory : object
+        nao.memory, memoria del NAO
+    puente : Puente
+        Conexion con el proceso de IA
+
+    Metodos
+    -------
+    suscribir()
+        Se suscribe a los eventos de toques y del SR
+    desuscribir()
+        Cancela las suscripciones
+    onTocarCabeza(key, value, message), onTocarMano(key, value, message), onEstadoSR(key, value, message)
+        Callbacks de ALMemory, avisan al proceso de IA
+    """
+    def __init__(self, name, memory, puente):
+        ALModule.__init__(self, name)
+        self.memory = memory
+        self.puente = puente
+
+    def suscribir(self):
+        for evento in EVENTOS_CABEZA:
+            self.memory.subscribeToEvent(evento, self.getName(), "onTocarCabeza")
+        for evento in EVENTOS_MANOS:
+            self.memory.subscribeToEvent(evento, self.getName(), "onTocarMano")
+        self.memory.subscribeToEvent(EVENTO_ESTADO_SR, self.getName(), "onEstadoSR")
+
+    def desuscribir(self):
+        for evento in EVENTOS_CABEZA + EVENTOS_MANOS + [EVENTO_ESTADO_SR]:
+            try:
+                self.memory.unsubscribeToEvent(evento, self.getName())
+            except RuntimeError:
+                print('Error al cancelar suscripcion a ' + evento)
+
+    def onTocarCabeza(self, key, value, message):
+        """Evento de ALMemory al tocar un sensor de la cabeza"""
+        if value > 0:
+            self.puente.notificar('cabeza')
+
+    def onTocarMano(self, key, value, message):
+        """Evento de ALMemory al tocar un sensor de las manos"""
+        if value > 0:
+            self.puente.notificar('mano')
+
+    def onEstadoSR(self, key, value, message):
+        """Evento de ALMemory con el estado del SR"""
+        self.puente.notificar('estadoSR', value)
+
+
+"""
+Clase ReceptorPuente que hereda de ALModule.
+    Recibe el audio crudo de los cuatro microfonos y lo deja en la memoria compartida
+"""
+class ReceptorPuente(ALModule):
+    """
+    Se suscribe a ALAudioDevice con los cuatro canales en 48 kHz, sin procesarlos
+    Cada bloque se copia al anillo de memoria compartida y por el puente solo viaja su posicion
+    ...
+    Atributos
+    ----------
+    adp : object
+        nao.adp, API AudioDevice del NAO
+    anillo : AnilloAudio
+        Memoria compartida con el proceso de IA
+    puente : Puente
+        Conexion con el proceso de IA
+    suscrito : bool
+        Si hay una suscripcion activa a ALAudioDevice
+
+    Metodos
+    -------
+    iniciar()
+        Inicia la suscripcion al audio
+    detener()
+        Cancela la suscripcion al audio, si la hay
+    processRemote(nbOfChannels, nbOfSamplesByChannel, timeStamp, inputBuffer)
+        Callback de ALAudioDevice con cada bloque de audio
+    """
+    FRECUENCIA_CANALES = 48000
+    TODOS_LOS_CANALES = 0
+
+    def __init__(self, name, adp, anillo, puente):
+        ALModule.__init__(self, name)
+        self.adp = adp
+        self.anillo = anillo
+        self.puente = puente
+        self.suscrito = False
+
+    def iniciar(self):
+        self.adp.setClientPreferences(self.getName(), self.FRECUENCIA_CANALES, self.TODOS_LOS_CANALES, 0)
+        self.adp.subscribe(self.getName())
+        self.suscrito = True
+
+    def detener(self):
+        # Al cerrar se llama aunque la conversacion ya haya cancelado la suscripcion
+        if not self.suscrito:
+            return
+        self.suscrito = False
+        try:
+            self.adp.unsubscribe(self.getName())
+        except RuntimeError:
+            print('Error al cancelar suscripcion de audio')
+
+    def processRemote(self, nbOfChannels, nbOfSamplesByChannel, timeStamp, inputBuffer):
+        """Recibe un bloque de audio de ALAudioDevice, NAOqi solo enlaza metodos con docstring"""
+        posicion = self.anillo.escribir(inputBuffer)
+        self.puente.enviarAudio(posicion, len(inputBuffer), nbOfChannels)
+
+
+"""
+Codigo principal
+MAIN
+
+Se crean los modulos del robot, se espera la conexion de cerebro.py y se atienden sus llamados
+hasta que cierre la conexion
+"""
+
+def main():
+    # Los modulos de NAOqi deben ser variables globales con el mismo nombre del modulo
+    global ControlNao, ReceptorPuente, SpeechTestClass, SpeechRecClass
+
+    parser = argparse.ArgumentParser(description="Proceso de control del NAO, se comunica con cerebro.py")
+    parser.add_argument("--ip", default=IP, help="IP del robot")
+    parser.add_argument("--puerto", type=int, default=PORT, help="Puerto del robot")
+    parser.add_argument("--socket", default=RUTA_SOCKET, help="Socket Unix del puente")
+    parser.add_argument("--simular", action="store_true", help="Usar NAOqi simulado (naoqi_falso.py)")
+    parser.add_argument("--audio", help="Con --simular, archivo WAV que se envia como audio de cada pregunta")
+    argumentos = parser.parse_args()
+
+    broker = ALBroker("controlBroker", "0.0.0.0", 0, argumentos.ip, argumentos.puerto)
+    if argumentos.simular:
+        naoqi_falso.AUDIO = argumentos.audio
+
+    ###Inicializar clases
+    nao = NAO()
+    anillo = AnilloAudio(RUTA_AUDIO, crear=True)
+    SpeechRecClass = SpeechTestClass(None, None, 'SpeechRecClass', nao.memory, PALABRAS_FIN)
+    SpeechTestClass = SpeechTestClass(None, None, 'SpeechTestClass', nao.memory, PALABRAS_INICIO)
+    SpeechTestClass.onLoad()
+    SpeechRecClass.onLoad()
+    SpeechTestClass.precargar(PALABRAS_INICIO + PALABRAS_FIN)
+    SpeechRecClass.precargar()
+    nao.iniciar()
+
+    print("Esperando a cerebro.py en " + argumentos.socket)
+    conexion = escuchar(argumentos.socket)
+    puente = Puente(conexion, {
+        'nao': nao,
+        'inicio': SpeechTestClass,
+        'fin': SpeechRecClass,
+    })
+    ControlNao = ControlNao('ControlNao', nao.memory, puente)
+    ReceptorPuente = ReceptorPuente('ReceptorPuente', nao.adp, anillo, puente)
+    puente.objetos['receptor'] = ReceptorPuente
+
+    # Las palabras clave se reenvian con el nombre con el que cerebro.py conoce a cada SR
+    SpeechTestClass.alReconocer = lambda: puente.notificar('palabra', 'inicio', SpeechTestClass.getWords())
+    SpeechRecClass.alReconocer = lambda: puente.notificar('palabra', 'fin', SpeechRecClass.getWords())
+    ControlNao.suscribir()
+
+    if argumentos.simular:
+        naoqi_falso.Consola().start()
+        print("Ordenes: hola, adios, apagar, cabeza, mano, fin, pausa N")
+
+    try:
+        while not puente.cerrado.is_set():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("Interrumpido, cerrando el puente")
+    puente.cerrar()
+
+    # Fin del proceso
+    ControlNao.desuscribir()
+    ReceptorPuente.detener()
+    SpeechRecClass.onUnload()
+    SpeechTestClass.onUnload()
+    nao.efectos.detener()
+    nao.posturas.goToPosture('Crouch', 0.5)
+    anillo.cerrar(borrar=True)
+    broker.shutdown()
+    print("CONTROL FINALIZADO")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# -*- encoding: UTF-8 -*-
+"""
+Conversacion guiada por eventos, sin depender de NAOqi
+    Contiene las acciones de cada estado de la conversacion del Plan B, con esperas por
+    eventos en lugar de consultas a la memoria del robot
+    Recibe el robot, los SR de palabras clave y el receptor de audio ya creados, por lo que
+    se usa igual dentro del robot (servicio.py, con modulos de NAOqi) que desde otro
+    proceso (cerebro.py, con objetos que reenvian los llamados por el puente)
+"""
+
+# Librerias principales
+from maquina import MaquinaConversacion  # Estados de la conversacion
+from efectos import EFECTOS_ESTADO      # Efecto de leds de cada estado
+
+# Librerías auxiliares
+import threading
+import time
+
+
+"""
+Declaracion de constantes
+    Eventos de ALMemory de los sensores tactiles y del SR
+"""
+EVENTOS_CABEZA = ["FrontTactilTouched", "MiddleTactilTouched", "RearTactilTouched"]
+EVENTOS_MANOS = ["HandRightBackTouched", "HandRightLeftTouched", "HandRightRightTouched",
+                 "HandLeftBackTouched", "HandLeftLeftTouched", "HandLeftRightTouched"]
+EVENTO_ESTADO_SR = "ALSpeechRecognition/Status"
+ESTADOS_FIN_SR = ["EndOfProcess", "Stop"]   # Estados del SR que indican que el usuario termino de hablar
+
+PALABRA_APAGAR = "apagar"
+ESPERA_MAXIMA = 1.0     # Segundos maximos entre revisiones si no llega ningun evento
+
+
+class Conversacion():
+    """
+    Clase con la conversacion completa, atiende una persona tras otra hasta que se diga 'apagar'
+    ...
+    Atributos
+    ----------
+    nao : NAO
+        Robot, o un objeto con los mismos metodos
+    planificador : Planificador
+        Respuestas de la IA con limite de tiempo por turno
+    inicio : SpeechTestClass
+        SR de las palabras de inicio, modo espera
+    fin : SpeechTestClass
+        SR de las palabras de fin, modo escucha
+    receptor : ReceptorAudio
+        Audio por bloques para el SR incremental
+    aviso : threading.Event
+        Se activa con cada evento, las acciones lo esperan en lugar de consultar la memoria
+    estadoSR : str
+        Ultimo estado de ALSpeechRecognition/Status
+    maquina : MaquinaConversacion
+        Maquina de la conversacion actual
+    activo : bool
+        Se siguen atendiendo conversaciones
+
+    Metodos
+    -------
+    tocarCabeza(), tocarMano(), cambiarEstadoSR(estado)
+        Registran un evento del robot y despiertan a la accion que espera
+    esperarAviso(condicion)
+        Espera eventos hasta que se cumpla la condicion
+    esperar(datos), saludar(datos), escuchar(datos), pensar(datos), hablar(respuesta), despedir(datos)
+        Acciones de cada estado, igual que en el Plan B
+    correr()
+        Atiende conversaciones hasta que se diga 'apagar'
+    """
+    def __init__(self, nao, planificador, inicio, fin, receptor):
+        """
+        Parametros
+        ----------
+        nao : NAO
+            Robot
+        planificador : Planificador
+            Planificador con IA.generar como generador e IA.recordar como registro
+        inicio : SpeechTestClass
+            SR de las palabras de inicio, con el vocabulario precargado
+        fin : SpeechTestClass
+            SR de las palabras de fin
+        receptor : ReceptorAudio
+            Receptor de audio del SR incremental
+        """
+        self.nao = nao
+        self.planificador = planificador
+        self.inicio = inicio
+        self.fin = fin
+        self.receptor = receptor
+        self.aviso = threading.Event()
+        self.estadoSR = None
+        self.maquina = None
+        self.activo = True
+        self.inicio.alReconocer = self.aviso.set
+        self.fin.alReconocer = self.aviso.set
+
+    def tocarCabeza(self):
+        self.nao.headTouched = True
+        self.aviso.set()
+
+    def tocarMano(self):
+        self.nao.handTouched = True
+        self.aviso.set()
+        # Tocar una mano mientras el robot piensa o habla interrumpe el turno
+        maquina = self.maquina
+        if maquina != None and maquina.estado in ['pensando', 'hablando']:
+            maquina.disparar('despedir')
+
+    def cambiarEstadoSR(self, estado):
+        self.estadoSR = estado
+        self.aviso.set()
+
+    def esperarAviso(self, condicion):
+        while True:
+            self.aviso.clear()
+            if condicion():
+                return
+            self.aviso.wait(ESPERA_MAXIMA)
+
+    def esperar(self, datos):
+        # Solo cuentan los toques desde que se arma el SR
+        self.nao.headTouched = False
+        self.nao.handTouched = False
+        self.inicio.armar()
+        self.esperarAviso(lambda: self.inicio.isSearchedWordSaid() or self.nao.headTouched or self.nao.handTouched)
+        self.inicio.desarmar()
+        return 'activar'
+
+    def saludar(self, datos):
+        self.nao.saludo()
+        return 'listo'
+
+    def escuchar(self, datos):
+        self.nao.headTouched = False
+        self.nao.handTouched = False
+        self.estadoSR = None
+        self.fin.armar()
+
+        print('Escuchando, tocar la cabeza para finalizar escucha')
+        print('Tocar una mano o decir adios para finalizar rutina')
+
+        # El audio llega por bloques al receptor, no hace falta grabar un archivo en el robot
+        self.receptor.iniciar()
+        self.esperarAviso(lambda: (self.fin.isSearchedWordSaid() or self.estadoSR in ESTADOS_FIN_SR
+                                   or self.nao.headTouched or self.nao.handTouched))
+        self.fin.desarmar()
+        self.receptor.detener()
+        print("Fin escucha")
+
+        if self.fin.isWordSaid or self.nao.handTouched:
+            return 'despedir'
+        return 'frase'
+
+    def pensar(self, datos):
+        try:
+            texto = self.receptor.transcribir()
+            print("Usuario: " + texto)
+            print("Respuesta: ")
+            return ('respuesta', self.nao.generar(texto, self.planificador.responder))
+        except LookupError:
+            self.nao.efectos.estado('error')
+            print("No fue posible transcribir el audio")
+        except Exception:
+            self.nao.efectos.estado('error')
+            print("Error")
+        return 'nada'
+
+    def hablar(self, respuesta):
+        self.nao.decir(respuesta)
+        time.sleep(1)
+        return 'listo'
+
+    def despedir(self, datos):
+        self.nao.tts.stopAll()
+        self.nao.despedida()
+        return 'listo'
+
+    def correr(self):
+        while self.activo:
+            self.maquina = MaquinaConversacion({
+                'espera': self.esperar,
+                'saludo': self.saludar,
+                'escuchando': self.escuchar,
+                'pensando': self.pensar,
+                'hablando': self.hablar,
+                'despedida': self.despedir,
+            }, alCambiar=lambda estado: self.nao.efectos.estado(EFECTOS_ESTADO[estado]))
+            print("decir HOLA/NAO para iniciar, o tocar")
+            self.maquina.ejecutar()
+
+            # Decir 'apagar' en lugar de 'adios' termina el servicio
+            palabras = self.fin.getWords()
+            if palabras != None and PALABRA_APAGAR in palabras[0]:
+                self.activo = False
@@ -0,0 +1,153 @@
+# -*- encoding: UTF-8 -*-
+"""
+Motor de efectos de leds
+    Ejecuta las animaciones de leds del NAO en un hilo aparte, para que la
+    retroalimentacion visual ocurra al mismo tiempo que el SR y la IA
+    Cada estado de la conversacion se asocia a un efecto, al cambiar de estado
+    el efecto anterior se cancela y se reemplaza por el nuevo
+"""
+
+# Librerías auxiliares
+import threading
+
+
+# Efecto de leds de cada estado de la conversacion, se cambia en cada transicion sin bloquear
+EFECTOS_ESTADO = {
+    'espera': 'espera',
+    'saludo': 'hablando',
+    'escuchando': 'escuchando',
+    'pensando': 'pensando',
+    'hablando': 'hablando',
+    'despedida': 'hablando',
+    'fin': 'apagado',
+}
+
+
+class EfectosLeds():
+    """
+    Clase que controla los leds del robot segun el estado de la conversacion
+    ...
+    Atributos
+    ----------
+    leds : object
+        API ALLeds del NAO
+    pedido : str
+        Ultimo estado solicitado
+    generacion : int
+        Contador de cambios de estado, permite que el efecto en curso detecte que fue cancelado
+    EFECTOS : dict
+        Relacion entre el nombre del estado y el metodo que ejecuta su efecto:
+            espera: orejas parpadeando lentamente
+            escuchando: leds en azul
+            pensando: animacion rasta hasta cambiar de estado
+            hablando: todos los leds encendidos
+            error: leds en rojo
+            apagado: todos los leds apagados
+
+    Metodos
+    -------
+    estado(nombre)
+        Cambia al efecto del estado indicado, no bloquea
+    detener()
+        Termina el hilo de efectos
+    """
+    FIN = "fin"
+
+    def __init__(self, leds):
+        """
+        Parametros
+        ----------
+        leds : ALProxy('ALLeds')
+            API de leds del robot
+        """
+        self.leds = leds
+        self.pedido = None
+        self.generacion = 0
+        self.atendida = 0
+        self.condicion = threading.Condition()
+        self.EFECTOS = {
+            'espera': self.espera,
+            'escuchando': self.escuchando,
+            'pensando': self.pensando,
+            'hablando': self.hablando,
+            'error': self.error,
+            'apagado': self.apagado,
+        }
+        self.hilo = threading.Thread(target=self.ciclo)
+        self.hilo.daemon = True
+        self.hilo.start()
+
+    def estado(self, nombre):
+        with self.condicion:
+            if nombre == self.pedido:
+                return
+            self.pedido = nombre
+            self.generacion += 1
+            self.condicion.notify()
+
+    def detener(self):
+        # Se espera a que inicie el ultimo efecto pedido, por ejemplo 'apagado'
+        with self.condicion:
+            while self.generacion != self.atendida and self.hilo.is_alive():
+                self.condicion.wait(0.05)
+        self.estado(self.FIN)
+        self.hilo.join(2)
+
+    def ciclo(self):
+        while True:
+            with self.condicion:
+                while self.generacion == self.atendida:
+                    self.condicion.wait()
+                self.atendida = self.generacion
+                nombre = self.pedido
+            if nombre == self.FIN:
+                return
+            try:
+                self.EFECTOS[nombre]()
+            except Exception:
+                print('ErrorLeds')
+
+    def cancelado(self):
+        return self.generacion != self.atendida
+
+    def pausa(self, segundos):
+        # Espera hasta que pase el tiempo o cambie el estado, retorna True si fue cancelado
+        with self.condicion:
+            if not self.cancelado():
+                self.condicion.wait(segundos)
+        return self.cancelado()
+
+    def animar(self, tarea, duracion):
+        # Espera una animacion lanzada con post, y la detiene si cambia el estado
+        if self.pausa(duracion):
+            self.leds.stop(tarea)
+            return True
+        return False
+
+    ## Efectos por estado
+    def espera(self):
+        while not self.cancelado():
+            if self.animar(self.leds.post.fadeRGB("EarLeds", 0x000000ff, 1.0), 1.0):
+                return
+            if self.animar(self.leds.post.fadeRGB("EarLeds", 0x00000020, 1.0), 1.0):
+                return
+
+    def escuchando(self):
+        self.leds.setIntensity("AllLeds", 0)
+        self.leds.setIntensity("AllLedsBlue", 0.9)
+        self.leds.on("EarLeds")
+
+    def pensando(self):
+        while not self.cancelado():
+            if self.animar(self.leds.post.rasta(1.5), 1.5):
+                return
+
+    def hablando(self):
+        self.leds.on("AllLeds")
+
+    def error(self):
+        self.leds.setIntensity("AllLeds", 0)
+        self.leds.setIntensity("AllLedsRed", 0.9)
+
+    def apagado(self):
+        self.leds.off("AllLeds")
@@ -0,0 +1,231 @@
+# -*- encoding: UTF-8 -*-
+"""
+Enrutador de preguntas por niveles de motor y presupuesto de tokens
+    Clasifica cada pregunta en el CPU, sin llamar al API, por su largo, palabras clave
+    y parecido con preguntas frecuentes, y la envia a un nivel con su propio motor y
+    limite de tokens: las preguntas simples usan el camino mas rapido
+    Mide la latencia de cada motor en cada nivel en una ventana deslizante, si el p95 de
+    un nivel supera su objetivo se envia el trafico a un motor alterno o al nivel inferior,
+    que responde con menos tokens
+    Las solicitudes fallidas tambien cuentan, con al menos LATENCIA_ERROR segundos
+    Todos los motores deben seguir instrucciones, un modelo base no sirve para el contexto de NAO
+"""
+
+# Librerías auxiliares
+import collections
+import math
+import re
+import threading
+import time
+
+
+"""
+Declaracion de constantes
+    Niveles de respuesta, del mas rapido al mas completo
+    Palabras clave y preguntas frecuentes para clasificar
+"""
+# Cada nivel tiene sus motores en orden de preferencia, el limite de tokens y el p95 objetivo en segundos
+# Si el motor de un nivel esta lento se baja de nivel: el mismo motor con menos tokens responde antes
+NIVELES = collections.OrderedDict([
+    ('corto', {'motores': ["gpt-3.5-turbo-instruct"], 'MT': 40, 'p95': 1.5}),
+    ('normal', {'motores': ["gpt-3.5-turbo-instruct"], 'MT': 85, 'p95': 2.5}),
+    ('explicacion', {'motores': ["gpt-3.5-turbo-instruct"], 'MT': 150, 'p95': 4.0}),
+])
+
+# Palabras o frases que piden una explicacion, deben aparecer completas y seguidas en la pregunta
+# ('que es' no coincide con 'que estas')
+PALABRAS_EXPLICACION = ["explica", "explicas", "explicar", "explícame", "explicame", "por qué", "por que",
+                        "cómo funciona", "como funciona", "diferencia", "describe", "descríbeme", "historia de",
+                        "qué es", "que es", "qué son", "que son"]
+
+# Preguntas frecuentes de respuesta corta, ademas de las claves de las respuestas locales
+PREGUNTAS_FRECUENTES = ["cómo te llamas", "quién eres", "dónde estás", "cuántos años tienes",
+                        "qué puedes hacer", "cómo estás", "quién te hizo", "te gusta bailar"]
+
+PALABRAS_CORTA = 5          # Preguntas con a lo sumo estas palabras van al nivel corto
+PALABRAS_LARGA = 18         # Preguntas con al menos estas palabras van al nivel de explicacion
+SIMILITUD_FRECUENTE = 0.5   # Parecido minimo con una pregunta frecuente para el nivel corto
+
+VENTANA = 50                # Latencias recientes que se guardan por motor y nivel
+VIGENCIA = 300.0            # Segundos tras los cuales una latencia se olvida, un motor lento vuelve a probarse
+MINIMO_MUESTRAS = 5         # Muestras minimas para confiar en el p95 de un motor
+LATENCIA_ERROR = 10.0       # Latencia minima que se registra por una solicitud fallida (error, 429 o tiempo agotado)
+
+
+def listaPalabras(texto):
+    """
+    Palabras en minuscula de un texto en su orden, sin signos de puntuacion
+    """
+    if not isinstance(texto, type(u'')):
+        texto = texto.decode('utf-8')
+    return re.findall(u'\\w+', texto.lower(), re.UNICODE)
+
+
+def palabras(texto):
+    """
+    Conjunto de palabras en minuscula de un texto, sin signos de puntuacion
+    """
+    return set(listaPalabras(texto))
+
+
+def contieneFrase(lista, frase):
+    """
+    Indica si las palabras de la frase aparecen completas y seguidas en la lista de palabras
+    """
+    buscadas = listaPalabras(frase)
+    return any([lista[i:i + len(buscadas)] == buscadas for i in range(len(lista) - len(buscadas) + 1)])
+
+
+def similitud(a, b):
+    """
+    Similitud de Jaccard entre las palabras de dos textos, de 0 a 1
+    """
+    palabrasA = palabras(a)
+    palabrasB = palabras(b)
+    if len(palabrasA | palabrasB) == 0:
+        return 0.0
+    return float(len(palabrasA & palabrasB)) / len(palabrasA | palabrasB)
+
+
+def clasificar(pregunta, frecuentes=PREGUNTAS_FRECUENTES):
+    """
+    Clasifica una pregunta en un nivel sin conectarse a la IA
+
+    Parametros
+    ----------
+    pregunta : str
+        Texto del usuario
+    frecuentes : list
+        Preguntas frecuentes de respuesta corta
+
+    Retorna el nombre del nivel: 'corto', 'normal' o 'explicacion'
+    """
+    lista = listaPalabras(pregunta)
+    cantidad = len(set(lista))
+    if any([contieneFrase(lista, clave) for clave in PALABRAS_EXPLICACION]) or cantidad >= PALABRAS_LARGA:
+        return 'explicacion'
+    if cantidad <= PALABRAS_CORTA or max([similitud(pregunta, frecuente) for frecuente in frecuentes]) >= SIMILITUD_FRECUENTE:
+        return 'corto'
+    return 'normal'
+
+
+class RegistroLatencias():
+    """
+    Latencias recientes en una ventana deslizante por llave, el Enrutador usa (motor, nivel)
+    ...
+    Atributos
+    ----------
+    ventana : int
+        Cantidad maxima de latencias que se guardan por llave
+    vigencia : float
+        Segundos tras los cuales una latencia se descarta
+    muestras : dict
+        Por llave, cola de (momento, segundos)
+
+    Metodos
+    -------
+    agregar(llave, segundos)
+        Registra la latencia de una solicitud
+    p95(llave)
+        Percentil 95 de las latencias vigentes, None si no hay suficientes muestras
+    """
+    def __init__(self, ventana=VENTANA, vigencia=VIGENCIA):
+        self.ventana = ventana
+        self.vigencia = vigencia
+        self.muestras = {}
+        self.candado = threading.Lock()
+
+    def agregar(self, llave, segundos):
+        with self.candado:
+            if llave not in self.muestras:
+                self.muestras[llave] = collections.deque(maxlen=self.ventana)
+            self.muestras[llave].append((time.time(), segundos))
+
+    def p95(self, llave):
+        with self.candado:
+            cola = self.muestras.get(llave, [])
+            limite = time.time() - self.vigencia
+            while len(cola) > 0 and cola[0][0] < limite:
+                cola.popleft()
+            if len(cola) < MINIMO_MUESTRAS:
+                return None
+            latencias = sorted([segundos for (momento, segundos) in cola])
+        return latencias[int(math.ceil(0.95 * len(latencias))) - 1]
+
+
+class Enrutador():
+    """
+    Clase que elige el motor y el limite de tokens de cada pregunta
+    ...
+    Atributos
+    ----------
+    niveles : OrderedDict
+        Niveles de respuesta del mas rapido al mas completo, ver NIVELES
+    latencias : RegistroLatencias
+        Latencias recientes de cada (motor, nivel): el mismo motor responde antes con menos tokens
+    conteo : dict
+        Cantidad de preguntas enviadas a cada (nivel, motor)
+    desvios : int
+        Preguntas enviadas fuera de su nivel o motor preferido por latencia alta
+
+    Metodos
+    -------
+    elegir(pregunta)
+        Retorna (motor, maxTokens, nivel) para la pregunta
+    registrar(motor, nivel, segundos, error=False)
+        Registra la latencia observada de una solicitud en su nivel, si fallo cuenta al menos LATENCIA_ERROR
+    resumen()
+        Devuelve un texto con el trafico y el p95 de cada motor por nivel
+    """
+    def __init__(self, niveles=NIVELES, ventana=VENTANA, vigencia=VIGENCIA):
+        self.niveles = niveles
+        self.latencias = RegistroLatencias(ventana, vigencia)
+        self.conteo = {}
+        self.desvios = 0
+
+    def elegir(self, pregunta):
+        nombres = list(self.niveles.keys())
+        preferido = clasificar(pregunta)
+
+        ## Se busca un motor sano en el nivel de la pregunta y luego en los niveles mas rapidos
+        ## El p95 de cada motor en cada nivel se calcula una vez, las muestras pueden vencer mientras tanto
+        eleccion = None
+        observados = {}
+        for nombre in reversed(nombres[:nombres.index(preferido) + 1]):
+            nivel = self.niveles[nombre]
+            for motor in nivel['motores']:
+                observados[motor, nombre] = self.latencias.p95((motor, nombre))
+                if observados[motor, nombre] == None or observados[motor, nombre] <= nivel['p95']:
+                    eleccion = (motor, nivel['MT'], nombre)
+                    break
+            if eleccion != None:
+                break
+
+        ## Si todos estan degradados se usa el motor con menor p95 del nivel mas rapido
+        if eleccion == None:
+            nombre = nombres[0]
+            motor = min(self.niveles[nombre]['motores'], key=lambda motor: observados[motor, nombre])
+            eleccion = (motor, self.niveles[nombre]['MT'], nombre)
+
+        if eleccion[2] != preferido or eleccion[0] != self.niveles[preferido]['motores'][0]:
+            self.desvios += 1
+            print("Enrutador: %s desviada a %s (%s)" % (preferido, eleccion[2], eleccion[0]))
+        llave = (eleccion[2], eleccion[0])
+        self.conteo[llave] = self.conteo.get(llave, 0) + 1
+        return eleccion
+
+    def registrar(self, motor, nivel, segundos, error=False):
+        if error:
+            segundos = max(segundos, LATENCIA_ERROR)
+        self.latencias.agregar((motor, nivel), segundos)
+
+    def resumen(self):
+        lineas = ["Enrutador: %d preguntas, %d desviadas por latencia" % (sum(self.conteo.values()), self.desvios)]
+        for (nombre, motor) in sorted(self.conteo.keys()):
+            lineas.append("  %s (%s): %d" % (nombre, motor, self.conteo[(nombre, motor)]))
+        for nombre, nivel in self.niveles.items():
+            for motor in nivel['motores']:
+                p95 = self.latencias.p95((motor, nombre))
+                if p95 != None:
+                    lineas.append("  p95 %s (%s): %.2fs" % (nombre, motor, p95))
+        return "\n".join(lineas)
@@ -0,0 +1,215 @@
+# -*- encoding: UTF-8 -*-
+"""
+# Librerías importadas
+## Por favor instalar las siguientes por medio de pip
+----------------------------------------
+Versiones:
+pip install openai==0.2.0
+----------------------------------------
+"""
+
+# Librerias principales
+import openai                       # API de OpenAI conexion con GPT
+import env                          # Archivo con la clave del API, ver README
+from consumo import CubetaTokens, Contabilidad # Control de admision y contadores de tokens
+
+# Librerías auxiliares
+import time
+
+
+"""
+Declaracion de constantes
+    Contexto de NAO en el robot
+    Limites del API y control de admision
+"""
+# Contexto de la IA del Plan B, el servicio y el reprocesamiento por lotes
+# Esta aqui y no en el plan para que las herramientas usen el mismo sin la SDK de NAOqi
+CONTEXTO = ("\nContexto:Eres NAO, un robot asistente educativo. "
+            "Tu funcion es explicar temas complejos de forma clara y asistir en la educación. "
+            "Debes mantener las respuestas cortas, concisas y claras. Ten en cuenta que tu audiencia "
+            "pueden ser niños y adultos mayores, por lo que debes ser muy amable y entretenido para todos."
+            " Si alguien pregunta donde estás, di que en el Robotifest 2023 de la Universidad de Costa Rica, "
+            " en el Museo de San Ramón."
+            " Responde utilizando lenguaje sencillo y cordial, como en una conversación, de forma amigable."
+            " A continuación la conversación: ")
+
+SOLICITUDES_POR_MINUTO = 60     # Solicitudes por minuto permitidas
+TOKENS_POR_MINUTO = 40000       # Tokens (entrada + salida) por minuto permitidos
+ESPERA_MAXIMA = 2.0             # Segundos que una solicitud en vivo puede esperar en cola antes de descartarse
+REINTENTOS = 2                  # Reintentos ante una respuesta 429 del API
+
+
+class LimiteExcedido(Exception):
+    """
+    Se lanza cuando una solicitud se descarta porque se agoto el presupuesto de solicitudes o tokens
+    """
+    pass
+
+
+"""
+Clase IA
+    Encargada de representar y conectar con la IA, el api de OPENAI
+    Guarda los parámetros de conexión y contexto para enlazar a la IA
+    Genera respuestas a partir del texto del usuario y la historia reciente de la conversacion
+    Si tiene enrutador, cada pregunta usa el motor y el limite de tokens de su nivel
+    Lleva la cuenta de tokens y limita las solicitudes para no exceder los limites del API
+"""
+##Clase IA, genera las respuestas mediante conexion al motor de IA gpt 3.5
+class IA():
+    """
+    Clase que representa la inteligencia artificial, conecta con la API, almacena infomacion de parametros y conversacion
+    ...
+    Atributos
+    ----------
+    ENGINE : str
+        Motor de IA de OpenAI, se usa si no hay enrutador
+    CONTEXT : str
+        Contexto que se antepone a la conversacion, describe el papel de NAO
+    MT : str
+        Limite de tokens maximos por respuesta, se usa si no hay enrutador
+    conversacion : list
+        Lista de dialogos entre la IA y el robot
+    limiteSolicitudes : CubetaTokens
+        Presupuesto de solicitudes por minuto
+    limiteTokens : CubetaTokens
+        Presupuesto de tokens por minuto
+    contabilidad : Contabilidad
+        Contadores de tokens por turno, sesion y hora
+    enrutador : Enrutador
+        Elige el motor y el limite de tokens de cada pregunta segun su nivel y la latencia reciente, o None
+    esperaMaxima : float
+        Segundos que una solicitud espera turno en el control de admision, None espera lo necesario
+
+
+    Metodos
+    -------
+    respuesta(pregunta)
+        Genera la respuesta con generar() y, si el API respondio, la guarda con recordar()
+    generar(pregunta)
+        Genera una respuesta con un motor de IA a partir del input de pregunta del usuario y la conversacion anterior reciente,
+        sin modificar la lista de conversacion:
+            Arma el prompt con el ultimo intercambio y la pregunta actual
+            Elige el motor y el limite de tokens con el enrutador
+            Espera turno en el control de admision, o lanza LimiteExcedido si no hay presupuesto
+            Genera una respuesta pasando los parametros y la conversacion al API, si falla devuelve el presupuesto tomado
+            Registra los tokens usados y la latencia del motor en su nivel, tambien si la solicitud fallo
+    recordar(pregunta, respuesta)
+        Agrega la pregunta y la respuesta a la lista de conversacion
+    estimarTokens(texto)
+        Estimacion rapida de la cantidad de tokens de un texto
+
+    """
+    def __init__(self, contexto, solicitudesPorMinuto=SOLICITUDES_POR_MINUTO, tokensPorMinuto=TOKENS_POR_MINUTO,
+                 enrutador=None, esperaMaxima=ESPERA_MAXIMA):
+        """
+        Parametros
+        ----------
+        contexto : str
+            Contexto de la IA, usualmente CONTEXTO
+        solicitudesPorMinuto : int
+            Presupuesto de solicitudes por minuto
+        tokensPorMinuto : int
+            Presupuesto de tokens por minuto
+        enrutador : Enrutador
+            Enrutador por niveles, con None todas las preguntas usan ENGINE y MT
+        esperaMaxima : float
+            Espera maxima en el control de admision antes de lanzar LimiteExcedido, con None
+            nunca se descarta (reprocesamiento por lotes)
+        """
+        self.ENGINE = "gpt-3.5-turbo-instruct"
+        self.CONTEXT = contexto
+        self.MT = 85
+        self.conversacion = []
+        self.limiteSolicitudes = CubetaTokens(solicitudesPorMinuto)
+        self.limiteTokens = CubetaTokens(tokensPorMinuto)
+        self.contabilidad = Contabilidad()
+        self.enrutador = enrutador
+        self.esperaMaxima = esperaMaxima
+        ##Declaracion del api key
+        openai.api_key = env.apikey
+
+    def estimarTokens(self, texto):
+        # Aproximadamente 4 caracteres por token
+        return len(texto) // 4 + 1
+
+    def respuesta(self, pregunta):
+        respuesta = self.generar(pregunta)
+        self.recordar(pregunta, respuesta)
+        return respuesta
+
+    def recordar(self, pregunta, respuesta):
+        # Solo se guardan turnos completos, una pregunta sin respuesta no entra a la conversacion
+        self.conversacion.append("\nPregunta: "+pregunta)
+        if type(respuesta) == str:
+            self.conversacion.append("\nRespuesta: "+respuesta)
+        else:
+            self.conversacion.append("\nRespuesta: "+respuesta.encode('utf-8'))
+
+    def generar(self, pregunta):
+
+        ## Ultimo intercambio de la conversacion y la pregunta actual
+        dialogo = "".join(self.conversacion[-2:]) + "\nPregunta: "+pregunta
+
+        prompt = (self.CONTEXT+dialogo+"\nRespuesta: ")
+
+        ## Motor y limite de tokens segun el nivel de la pregunta
+        motor, maxTokens, nivel = self.ENGINE, self.MT, None
+        if self.enrutador != None:
+            motor, maxTokens, nivel = self.enrutador.elegir(pregunta)
+
+        ## Control de admision: se espera turno o se descarta la solicitud
+        estimado = self.estimarTokens(prompt) + maxTokens
+        if not self.limiteSolicitudes.tomar(1, self.esperaMaxima):
+            self.contabilidad.rechazo()
+            raise LimiteExcedido("Sin presupuesto de solicitudes por minuto")
+        if not self.limiteTokens.tomar(estimado, self.esperaMaxima):
+            self.limiteSolicitudes.devolver(1)
+            self.contabilidad.rechazo()
+            raise LimiteExcedido("Sin presupuesto de tokens por minuto")
+
+        ## Si el API responde 429 se reintenta con espera creciente
+        ## Si falla por otro motivo se devuelve lo tomado de las cubetas, la solicitud no llego a consumirlo
+        ## Una solicitud fallida tambien se registra en el enrutador, para que deje de usar ese nivel
+        primero = time.time()
+        try:
+            for intento in range(REINTENTOS + 1):
+                try:
+                    inicio = time.time()
+                    response = openai.Completion.create(
+                        engine=motor,
+                        prompt = prompt,
+                        max_tokens= maxTokens
+                    )
+                    break
+                except openai.error.RateLimitError:
+                    self.contabilidad.limiteApi()
+                    if intento == REINTENTOS:
+                        raise
+                    time.sleep(2 ** intento)
+                except Exception:
+                    self.limiteSolicitudes.devolver(1)
+                    self.limiteTokens.devolver(estimado)
+                    raise
+        except Exception:
+            if self.enrutador != None:
+                self.enrutador.registrar(motor, nivel, time.time() - primero, error=True)
+            raise
+        if self.enrutador != None:
+            self.enrutador.registrar(motor, nivel, time.time() - inicio)
+
+        ## Se registran los tokens reales y se corrige la estimacion en la cubeta
+        uso = response.get("usage", {})
+        entrada = uso.get("prompt_tokens", 0)
+        salida = uso.get("completion_tokens", 0)
+        self.contabilidad.registrar(entrada, salida)
+        if entrada + salida > 0 and entrada + salida < estimado:
+            self.limiteTokens.devolver(estimado - entrada - salida)
+
+        output = (response.choices[0].text)
+        end = max([output.rfind('.'), output.rfind('?'), output.rfind('!')])
+        if len(output) > 0:
+            respuesta = output[:end+1]
+        else:
+            respuesta = ' '
+
+        return respuesta
@@ -0,0 +1,202 @@
+# -*- encoding: UTF-8 -*-
+"""
+Reprocesamiento por lotes de grabaciones
+    Transcribe un directorio de grabaciones WAV, por ejemplo los rec.wav del Plan B,
+    y opcionalmente genera la respuesta de la IA para cada texto
+    Cada archivo se lee con mmap y se procesa en un grupo de procesos, uno por nucleo
+    Con --beamformer las grabaciones de cuatro canales pasan por el beamformer y se reducen
+    a 16 kHz como en el Plan B en vivo, sin el se usa solo el microfono frontal
+    Los resultados se escriben en un archivo JSON lines, una linea por grabacion,
+    con el texto, la respuesta y la latencia de cada etapa
+
+Uso:
+    python lote.py grabaciones/
+    python lote.py grabaciones/ --ia --salida resultados.jsonl --procesos 8
+    python3 lote.py grabaciones/ --beamformer     (requiere numpy)
+"""
+
+# Librerias principales
+import speech_recognition as sr     # Reconocimiento de voz
+from reconocimiento import FuenteAudio # Formato de audio PCM crudo para el SR
+try:
+    from beamformer import procesarDatos # Beamforming de los cuatro microfonos, requiere numpy
+except ImportError:
+    procesarDatos = None
+
+# Librerías auxiliares
+import argparse
+import array
+import json
+import math
+import mmap
+import multiprocessing
+import os
+import time
+import wave
+
+
+"""
+Declaracion de constantes
+"""
+IDIOMA = "es-CR"
+CANAL_FRONTAL = 2       # Canal del microfono frontal en las grabaciones de cuatro canales del NAO
+CANALES_BEAMFORMER = 4  # Canales que combina el beamformer
+FRECUENCIA_SR = 16000   # Frecuencia del audio que recibe el SR en vivo despues del beamformer
+
+# Estado de cada proceso del grupo, se crea una vez por proceso en iniciarProceso
+recognizer = None
+ia = None
+conBeamformer = False
+
+
+def iniciarProceso(idioma, conIA, procesos, beamformer=False):
+    """
+    Crea el reconocedor y la IA de un proceso del grupo
+
+    Parametros
+    ----------
+    idioma : str
+        Idioma del SR
+    conIA : bool
+        Si se genera la respuesta de la IA para cada texto
+    procesos : int
+        Cantidad de procesos, el presupuesto del API se reparte entre ellos
+    beamformer : bool
+        Si las grabaciones de cuatro canales pasan por el beamformer
+    """
+    global recognizer, ia, conBeamformer
+    recognizer = sr.Recognizer(idioma)
+    conBeamformer = beamformer
+    if conIA:
+        # Mismo contexto que el Plan B en el robot, para que las respuestas sirvan para ajustarlo
+        # Sin espera maxima: en un lote las solicitudes hacen fila hasta tener presupuesto, no se descartan
+        from ia import IA, CONTEXTO, SOLICITUDES_POR_MINUTO, TOKENS_POR_MINUTO
+        from enrutador import Enrutador
+        ia = IA(CONTEXTO, SOLICITUDES_POR_MINUTO / float(procesos), TOKENS_POR_MINUTO / float(procesos),
+                enrutador=Enrutador(), esperaMaxima=None)
+
+
+def leerWav(ruta, canal=CANAL_FRONTAL, beamformer=False):
+    """
+    Lee una grabacion WAV con mmap y la deja en un solo canal
+    Con beamformer, una grabacion de cuatro canales se combina y se reduce a 16 kHz como en vivo
+
+    Retorna (frecuencia, ancho, datos, azimut) con los datos PCM mono y la direccion estimada
+    en grados, o None sin beamformer
+    """
+    with open(ruta, 'rb') as archivo:
+        mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        wav = wave.open(mapa)
+        frecuencia = wav.getframerate()
+        ancho = wav.getsampwidth()
+        canales = wav.getnchannels()
+        datos = wav.readframes(wav.getnframes())
+    finally:
+        mapa.close()
+
+    ## Las grabaciones del NAO tienen cuatro canales, se combinan o se usa solo el microfono frontal
+    if (beamformer and canales == CANALES_BEAMFORMER and ancho == 2
+            and frecuencia % FRECUENCIA_SR == 0 and frecuencia > FRECUENCIA_SR):
+        datos, azimut = procesarDatos(datos, frecuencia, frecuenciaSalida=FRECUENCIA_SR)
+        return FRECUENCIA_SR, ancho, datos, float(azimut)
+    if canales > 1 and ancho == 2:
+        muestras = array.array('h', datos)[min(canal, canales - 1)::canales]
+        try:
+            datos = muestras.tobytes()      # Python 3
+        except AttributeError:
+            datos = muestras.tostring()     # Python 2.7
+    return frecuencia, ancho, datos, None
+
+
+def procesar(ruta):
+    """
+    Transcribe una grabacion y genera la respuesta de la IA, en un proceso del grupo
+
+    Retorna un diccionario con los resultados y latencias en segundos
+    """
+    resultado = {'archivo': ruta, 'texto': None, 'respuesta': None, 'error': None}
+    inicio = time.time()
+    try:
+        frecuencia, ancho, datos, azimut = leerWav(ruta, beamformer=conBeamformer)
+        resultado['duracion'] = len(datos) / float(frecuencia * ancho)
+        if azimut != None:
+            resultado['azimut'] = azimut
+        resultado['lectura'] = time.time() - inicio
+
+        inicioSR = time.time()
+        try:
+            audio = sr.AudioData(frecuencia, recognizer.samples_to_flac(FuenteAudio(frecuencia, ancho), datos))
+            resultado['texto'] = recognizer.recognize(audio)
+        except LookupError:
+            resultado['error'] = "No fue posible transcribir el audio"
+        resultado['sr'] = time.time() - inicioSR
+
+        if ia != None and resultado['texto'] != None:
+            # Cada grabacion se responde por separado, sin la conversacion de las anteriores
+            ia.conversacion = []
+            inicioIA = time.time()
+            resultado['respuesta'] = ia.respuesta(resultado['texto'])
+            resultado['ia'] = time.time() - inicioIA
+    except Exception as e:
+        resultado['error'] = "%s: %s" % (type(e).__name__, e)
+    resultado['total'] = time.time() - inicio
+    return resultado
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[int(math.ceil(p * len(valores))) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe y responde un directorio de grabaciones WAV")
+    parser.add_argument("directorio", help="Directorio con grabaciones WAV, se busca de forma recursiva")
+    parser.add_argument("--salida", default="resultados.jsonl", help="Archivo JSON lines de salida")
+    parser.add_argument("--procesos", type=int, default=multiprocessing.cpu_count(), help="Procesos del grupo")
+    parser.add_argument("--ia", action="store_true", help="Generar tambien la respuesta de la IA")
+    parser.add_argument("--idioma", default=IDIOMA, help="Idioma del SR")
+    parser.add_argument("--beamformer", action="store_true",
+                        help="Combinar los cuatro canales con el beamformer y reducir a 16 kHz, como el Plan B en vivo")
+    argumentos = parser.parse_args()
+    if argumentos.beamformer and procesarDatos == None:
+        parser.error("--beamformer requiere numpy")
+
+    archivos = []
+    for carpeta, subcarpetas, nombres in os.walk(argumentos.directorio):
+        archivos += [os.path.join(carpeta, nombre) for nombre in nombres if nombre.lower().endswith(".wav")]
+    archivos.sort()
+    print("Grabaciones: %d, procesos: %d" % (len(archivos), argumentos.procesos))
+    if len(archivos) == 0:
+        return
+
+    inicio = time.time()
+    grupo = multiprocessing.Pool(argumentos.procesos, iniciarProceso,
+                                 (argumentos.idioma, argumentos.ia, argumentos.procesos, argumentos.beamformer))
+    latencias = []
+    exitos = 0
+    try:
+        with open(argumentos.salida, 'w') as salida:
+            # Los resultados se escriben en el orden en que terminan, cada linea indica su archivo
+            for i, resultado in enumerate(grupo.imap_unordered(procesar, archivos, chunksize=4)):
+                salida.write(json.dumps(resultado, sort_keys=True) + "\n")
+                latencias.append(resultado['total'])
+                if resultado['texto'] != None:
+                    exitos += 1
+                if (i + 1) % 100 == 0:
+                    print("  %d/%d procesadas" % (i + 1, len(archivos)))
+        grupo.close()
+    except KeyboardInterrupt:
+        grupo.terminate()
+        raise
+    grupo.join()
+
+    duracion = time.time() - inicio
+    print("Resultados en %s" % argumentos.salida)
+    print("  Transcritas: %d de %d (%.0f%%)" % (exitos, len(archivos), 100.0 * exitos / len(archivos)))
+    print("  Latencia por grabacion: p50 %.2fs, p95 %.2fs" % (percentil(latencias, 0.5), percentil(latencias, 0.95)))
+    print("  Tiempo total: %.1fs (%.0f grabaciones por minuto)" % (duracion, 60 * len(archivos) / duracion))
+
+
+if __name__ == "__main__":
+    main()
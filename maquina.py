@@ -0,0 +1,183 @@
+# -*- encoding: UTF-8 -*-
+"""
+Maquina de estados de la conversacion
+    Reemplaza el ciclo while True de los planes por estados explicitos:
+        espera -> saludo -> escuchando -> pensando -> hablando -> ... -> despedida -> fin
+    Las transiciones se producen por eventos que llegan a una cola
+    Las acciones de cada estado (llamadas bloqueantes a NAOqi, SR o la IA) se ejecutan
+    en un grupo de hilos, por lo que el ciclo de eventos sigue atendiendo otros eventos
+    mientras tanto (sensores, cambios de leds)
+    La SDK de NAOqi solo existe para Python 2.7, que no tiene asyncio, por eso el ciclo
+    de eventos se implementa con threading y Queue
+"""
+
+# Librerías auxiliares
+import threading
+
+try:
+    import Queue as queue   # Python 2.7
+except ImportError:
+    import queue            # Python 3
+
+
+"""
+Declaracion de constantes
+    Transiciones por defecto: (estado, evento) -> nuevo estado
+    Todo estado con accion acepta 'nada', que es tambien el evento que se dispara si la accion falla
+"""
+TRANSICIONES = {
+    ('espera', 'activar'): 'saludo',
+    ('espera', 'nada'): 'espera',
+    ('saludo', 'listo'): 'escuchando',
+    ('saludo', 'nada'): 'escuchando',
+    ('escuchando', 'frase'): 'pensando',
+    ('escuchando', 'nada'): 'escuchando',
+    ('escuchando', 'despedir'): 'despedida',
+    ('pensando', 'respuesta'): 'hablando',
+    ('pensando', 'nada'): 'escuchando',
+    ('pensando', 'despedir'): 'despedida',
+    ('hablando', 'listo'): 'escuchando',
+    ('hablando', 'nada'): 'escuchando',
+    ('hablando', 'despedir'): 'despedida',
+    ('despedida', 'listo'): 'fin',
+    ('despedida', 'nada'): 'fin',
+}
+
+
+class Ejecutor():
+    """
+    Grupo de hilos que ejecuta las llamadas bloqueantes fuera del ciclo de eventos
+    ...
+    Atributos
+    ----------
+    tareas : Queue
+        Cola de tareas pendientes, cada una es (funcion, alTerminar)
+
+    Metodos
+    -------
+    enviar(funcion, alTerminar=None)
+        Agenda la funcion, al terminar se llama alTerminar(resultado, error)
+    detener()
+        Termina los hilos
+    """
+    def __init__(self, trabajadores=3):
+        self.tareas = queue.Queue()
+        self.hilos = []
+        for i in range(trabajadores):
+            hilo = threading.Thread(target=self.trabajar)
+            hilo.daemon = True
+            hilo.start()
+            self.hilos.append(hilo)
+
+    def enviar(self, funcion, alTerminar=None):
+        self.tareas.put((funcion, alTerminar))
+
+    def detener(self):
+        for hilo in self.hilos:
+            self.tareas.put(None)
+
+    def trabajar(self):
+        while True:
+            tarea = self.tareas.get()
+            if tarea == None:
+                return
+            funcion, alTerminar = tarea
+            resultado = None
+            error = None
+            try:
+                resultado = funcion()
+            except Exception as e:
+                error = e
+            if alTerminar != None:
+                alTerminar(resultado, error)
+
+
+class MaquinaConversacion():
+    """
+    Clase que representa el flujo de la conversacion como una maquina de estados
+    ...
+    Atributos
+    ----------
+    estado : str
+        Estado actual
+    acciones : dict
+        Funcion que se ejecuta al entrar a cada estado, recibe los datos del evento
+        Puede retornar un evento, como texto o como tupla (evento, datos), que se dispara al terminar
+    transiciones : dict
+        Relacion (estado, evento) -> nuevo estado
+    alCambiar : function
+        Se llama con el nuevo estado en cada transicion, por ejemplo para cambiar los leds
+    turno : int
+        Cantidad de veces que se ha entrado a un estado, permite descartar eventos de acciones viejas
+    ejecutor : Ejecutor
+        Hilos donde corren las acciones
+
+    Metodos
+    -------
+    disparar(evento, datos=None)
+        Agrega un evento a la cola, se puede llamar desde cualquier hilo
+    transicion(evento)
+        Aplica la transicion del evento al estado actual, retorna el nuevo estado o None
+    ejecutar()
+        Ciclo de eventos, termina al llegar al estado 'fin'
+    """
+    FIN = 'fin'
+
+    def __init__(self, acciones, estadoInicial='espera', transiciones=TRANSICIONES,
+                 alCambiar=None, ejecutor=None):
+        self.acciones = acciones
+        self.estado = estadoInicial
+        self.transiciones = transiciones
+        self.alCambiar = alCambiar
+        self.ejecutor = ejecutor if ejecutor != None else Ejecutor()
+        self.eventos = queue.Queue()
+        self.turno = 0
+
+    def disparar(self, evento, datos=None):
+        self.eventos.put((evento, datos, None))
+
+    def transicion(self, evento):
+        nuevo = self.transiciones.get((self.estado, evento))
+        if nuevo == None:
+            print("Evento '%s' ignorado en estado '%s'" % (evento, self.estado))
+            return None
+        self.estado = nuevo
+        self.turno += 1
+        return nuevo
+
+    def entrar(self, datos=None):
+        if self.alCambiar != None:
+            try:
+                self.alCambiar(self.estado)
+            except Exception as e:
+                print("Error al cambiar de estado: " + str(e))
+
+        accion = self.acciones.get(self.estado)
+        if accion == None:
+            return
+        estado = self.estado
+        turno = self.turno
+
+        # El evento que retorna la accion se marca con su turno, si la maquina ya cambio de estado se descarta
+        def alTerminar(resultado, error):
+            if error != None:
+                print("Error en estado '%s': %s" % (estado, str(error)))
+                resultado = 'nada'
+            if resultado == None:
+                return
+            if isinstance(resultado, tuple):
+                self.eventos.put((resultado[0], resultado[1], turno))
+            else:
+                self.eventos.put((resultado, None, turno))
+
+        self.ejecutor.enviar(lambda: accion(datos), alTerminar)
+
+    def ejecutar(self):
+        self.entrar()
+        while self.estado != self.FIN:
+            evento, datos, turno = self.eventos.get()
+            if turno != None and turno != self.turno:
+                continue
+            if self.transicion(evento) != None:
+                self.entrar(datos)
+        self.ejecutor.detener()
@@ -0,0 +1,259 @@
+# -*- encoding: UTF-8 -*-
+"""
+NAOqi simulado para probar el servicio en una computadora con Linux, sin robot
+    Reemplaza al modulo naoqi con las clases ALBroker, ALProxy y ALModule
+    ALMemory guarda datos y entrega eventos a los modulos suscritos, como en el robot
+    El habla se imprime en la terminal, ALAudioDevice envia un archivo WAV o silencio
+    por bloques a processRemote
+    Consola lee ordenes de la terminal para simular al usuario: palabras, toques y fin de voz
+
+Uso:
+    python servicio.py --simular
+    python servicio.py --simular --audio pregunta.wav
+"""
+
+# Librerías auxiliares
+import sys
+import threading
+import time
+import wave
+
+
+"""
+Declaracion de constantes
+"""
+AUDIO = None            # Archivo WAV que ALAudioDevice envia en cada suscripcion, None envia silencio
+BLOQUE = 0.17           # Segundos de audio por llamada a processRemote, como en el robot
+PALABRA_CONFIANZA = 0.8 # Confianza de las palabras simuladas
+
+# Modulos creados por nombre, ALMemory y ALAudioDevice los buscan para llamar sus metodos
+MODULOS = {}
+
+
+class Registro():
+    """
+    Reemplazo del logger de ALModule, imprime en la terminal
+    """
+    def __init__(self, nombre):
+        self.nombre = nombre
+
+    def info(self, mensaje):
+        print("[%s] %s" % (self.nombre, mensaje))
+
+    def warning(self, mensaje):
+        print("[%s] Advertencia: %s" % (self.nombre, mensaje))
+
+    def error(self, mensaje):
+        print("[%s] Error: %s" % (self.nombre, mensaje))
+
+
+class ALBroker():
+    """
+    Broker simulado, todos los modulos viven en el mismo proceso
+    """
+    def __init__(self, nombre, ip, puerto, ipPadre, puertoPadre):
+        self.nombre = nombre
+        print("NAOqi simulado: broker %s conectado a %s:%s" % (nombre, ipPadre, puertoPadre))
+
+    def shutdown(self):
+        print("NAOqi simulado: broker %s detenido" % self.nombre)
+
+
+class ALModule(object):
+    """
+    Modulo simulado, se registra por nombre para recibir eventos y audio
+    """
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.logger = Registro(nombre)
+        MODULOS[nombre] = self
+
+    def getName(self):
+        return self.nombre
+
+    def BIND_PYTHON(self, *argumentos):
+        pass
+
+
+class Asincrono(object):
+    """
+    Equivalente a proxy.post: ejecuta el metodo en un hilo y retorna un identificador
+    """
+    def __init__(self, servicio):
+        self.servicio = servicio
+
+    def __getattr__(self, metodo):
+        def llamar(*argumentos):
+            hilo = threading.Thread(target=getattr(self.servicio, metodo), args=argumentos)
+            hilo.daemon = True
+            hilo.start()
+            return id(hilo)
+        return llamar
+
+
+class Servicio(object):
+    """
+    Servicio generico: acepta cualquier metodo y no hace nada, por ejemplo ALLeds o ALRobotPosture
+    """
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.post = Asincrono(self)
+
+    def __getattr__(self, metodo):
+        return lambda *argumentos: None
+
+
+class ALMemory(Servicio):
+    def __init__(self, nombre):
+        Servicio.__init__(self, nombre)
+        self.datos = {}
+        self.suscripciones = {}
+        self.candado = threading.Lock()
+
+    def getData(self, llave):
+        with self.candado:
+            return self.datos.get(llave, 0.0)
+
+    def insertData(self, llave, valor):
+        with self.candado:
+            self.datos[llave] = valor
+
+    def subscribeToEvent(self, evento, modulo, metodo):
+        with self.candado:
+            self.suscripciones.setdefault(evento, {})[modulo] = metodo
+
+    def unsubscribeToEvent(self, evento, modulo):
+        with self.candado:
+            if modulo not in self.suscripciones.get(evento, {}):
+                raise RuntimeError("%s no esta suscrito a %s" % (modulo, evento))
+            del self.suscripciones[evento][modulo]
+
+    def raiseEvent(self, evento, valor):
+        self.insertData(evento, valor)
+        with self.candado:
+            suscritos = list(self.suscripciones.get(evento, {}).items())
+        # Como en el robot, cada callback corre en un hilo de NAOqi
+        for modulo, metodo in suscritos:
+            hilo = threading.Thread(target=getattr(MODULOS[modulo], metodo), args=(evento, valor, ""))
+            hilo.daemon = True
+            hilo.start()
+
+
+class ALTextToSpeech(Servicio):
+    def say(self, texto, configuracion=None):
+        print("[NAO dice] %s" % texto)
+        time.sleep(min(3.0, 0.03 * len(texto)))
+
+
+class ALSpeechRecognition(Servicio):
+    def __init__(self, nombre):
+        Servicio.__init__(self, nombre)
+        self.pausado = True
+        self.vocabulario = []
+
+    def pause(self, pausado):
+        self.pausado = pausado
+
+    def setVocabulary(self, vocabulario, deteccion):
+        self.vocabulario = list(vocabulario)
+
+
+class ALAudioDevice(Servicio):
+    def __init__(self, nombre):
+        Servicio.__init__(self, nombre)
+        self.preferencias = {}
+        self.activos = {}
+
+    def setClientPreferences(self, modulo, frecuencia, canales, entrelazado):
+        self.preferencias[modulo] = (frecuencia, canales)
+
+    def subscribe(self, modulo):
+        activo = threading.Event()
+        activo.set()
+        self.activos[modulo] = activo
+        hilo = threading.Thread(target=self.enviar, args=(MODULOS[modulo], self.preferencias.get(modulo, (16000, 3)), activo))
+        hilo.daemon = True
+        hilo.start()
+
+    def unsubscribe(self, modulo):
+        if modulo not in self.activos:
+            raise RuntimeError("%s no esta suscrito a ALAudioDevice" % modulo)
+        self.activos.pop(modulo).clear()
+
+    def enviar(self, modulo, preferencias, activo):
+        frecuencia, canales = preferencias
+        canales = 4 if canales == 0 else 1
+        datos = b""
+        if AUDIO != None:
+            archivo = wave.open(AUDIO, 'rb')
+            frecuencia = archivo.getframerate()
+            canales = archivo.getnchannels()
+            datos = archivo.readframes(archivo.getnframes())
+            archivo.close()
+        muestras = int(frecuencia * BLOQUE)
+        tamano = muestras * canales * 2
+        posicion = 0
+        while activo.is_set():
+            bloque = datos[posicion:posicion + tamano]
+            posicion += tamano
+            if len(bloque) < tamano:
+                bloque += b"\x00" * (tamano - len(bloque))
+            modulo.processRemote(canales, muestras, [int(time.time()), 0], bloque)
+            time.sleep(BLOQUE)
+
+
+# Una sola instancia por servicio, como en el robot
+SERVICIOS = {
+    "ALMemory": ALMemory,
+    "ALTextToSpeech": ALTextToSpeech,
+    "ALAnimatedSpeech": ALTextToSpeech,
+    "ALSpeechRecognition": ALSpeechRecognition,
+    "ALAudioDevice": ALAudioDevice,
+}
+instancias = {}
+
+
+def ALProxy(nombre, *direccion):
+    if nombre not in instancias:
+        instancias[nombre] = SERVICIOS.get(nombre, Servicio)(nombre)
+    return instancias[nombre]
+
+
+class Consola(threading.Thread):
+    """
+    Simula al usuario con ordenes escritas en la terminal, una por linea:
+        cabeza          toca el sensor frontal de la cabeza
+        mano            toca el sensor trasero de la mano derecha
+        fin             el SR indica que el usuario termino de hablar
+        pausa N         espera N segundos, util al leer las ordenes de un archivo
+        otra palabra    el SR la reconoce si esta en el vocabulario y no esta en pausa
+    """
+    def __init__(self, entrada=sys.stdin):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.entrada = entrada
+
+    def run(self):
+        memoria = ALProxy("ALMemory")
+        sr = ALProxy("ALSpeechRecognition")
+        for linea in iter(self.entrada.readline, ""):
+            orden = linea.strip().lower()
+            if orden == "":
+                continue
+            elif orden == "cabeza":
+                self.tocar(memoria, "FrontTactilTouched")
+            elif orden == "mano":
+                self.tocar(memoria, "HandRightBackTouched")
+            elif orden == "fin":
+                memoria.raiseEvent("ALSpeechRecognition/Status", "EndOfProcess")
+            elif orden.startswith("pausa"):
+                time.sleep(float(orden.split()[-1]))
+            elif sr.pausado or orden not in sr.vocabulario:
+                print("NAOqi simulado: '%s' no se reconoce (SR en pausa o fuera del vocabulario)" % orden)
+            else:
+                memoria.raiseEvent("WordRecognized", [orden, PALABRA_CONFIANZA])
+
+    def tocar(self, memoria, sensor):
+        memoria.raiseEvent(sensor, 1.0)
+        time.sleep(0.1)
+        memoria.raiseEvent(sensor, 0.0)
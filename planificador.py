@@ -0,0 +1,167 @@
+# -*- encoding: UTF-8 -*-
+"""
+Planificador de respuestas con limite de tiempo
+    Envuelve al generador de respuestas (IA.generar) y garantiza que cada turno
+    termine en un tiempo acotado:
+        Si la IA tarda mas del limite suave, el robot dice una frase de relleno
+        Si la IA tarda mas del limite duro o falla, se responde con un respaldo local
+    Lleva el conteo de cuantas veces se toma cada camino
+    Guarda en la conversacion solo la respuesta que se entrega en cada turno: una consulta
+    abandonada que termina tarde no se registra
+"""
+
+# Librerías auxiliares
+import threading
+import time
+
+
+"""
+Declaracion de constantes
+    Limites de tiempo por turno, en segundos
+    Respuestas locales de respaldo
+"""
+LIMITE_SUAVE = 2.5     # Tiempo tras el cual se dice la frase de relleno
+LIMITE_DURO = 7.0      # Tiempo tras el cual se abandona la consulta a la IA
+
+# Respuestas locales, se buscan por palabras clave dentro de la pregunta
+RESPUESTAS_LOCALES = [
+    (["llamas", "nombre", "quien eres"],
+     "Me llamo NAO, soy un robot asistente educativo."),
+    (["dónde estás", "donde estas", "dónde estamos", "donde estamos"],
+     "Estoy en el Robotifest 2023 de la Universidad de Costa Rica."),
+    (["años tienes", "edad"],
+     "Soy un robot, así que no cumplo años, pero siempre estoy aprendiendo."),
+    (["gracias"],
+     "Con mucho gusto, para eso estoy."),
+]
+
+RESPUESTA_GENERICA = ("Disculpa, en este momento no logro pensar bien la respuesta. "
+                      "¿Me puedes preguntar de nuevo?")
+
+
+def respuestaLocal(pregunta):
+    """
+    Busca una respuesta local para la pregunta, sin conectarse a la IA
+
+    Parametros
+    ----------
+    pregunta : str
+        Texto del usuario
+
+    Retorna la respuesta local asociada a la primera palabra clave encontrada,
+    o la respuesta generica si no hay coincidencias
+    """
+    texto = pregunta.lower()
+    for claves, respuesta in RESPUESTAS_LOCALES:
+        if any([clave in texto for clave in claves]):
+            return respuesta
+    return RESPUESTA_GENERICA
+
+
+class Planificador():
+    """
+    Clase que agenda la generacion de respuestas con un presupuesto de tiempo por turno
+    ...
+    Atributos
+    ----------
+    generador : function
+        Funcion que genera la respuesta a partir del texto sin guardarla, usualmente IA.generar
+    relleno : function
+        Funcion sin parametros que se llama al pasar el limite suave, por ejemplo NAO.pensar
+        Debe retornar de inmediato para no consumir el presupuesto del turno
+    respaldo : function
+        Funcion que genera la respuesta local cuando la IA falla o pasa el limite duro
+    registrar : function
+        Recibe (texto, respuesta) con la respuesta entregada en cada turno, usualmente IA.recordar
+    limiteSuave : float
+        Segundos de espera antes de decir la frase de relleno
+    limiteDuro : float
+        Segundos maximos de espera por la IA
+    conteo : dict
+        Cantidad de turnos resueltos por cada camino:
+            directo: la IA respondio antes del limite suave
+            relleno: la IA respondio luego de decir la frase de relleno
+            limite: se abandono la IA al pasar el limite duro
+            error: la IA lanzo una excepcion
+
+    Metodos
+    -------
+    responder(texto)
+        Genera la respuesta del turno respetando los limites de tiempo y la registra
+    consultar(texto)
+        Consulta al generador con los limites de tiempo, retorna su respuesta o la de respaldo
+    resumen()
+        Devuelve un texto con la frecuencia de cada camino
+    """
+    def __init__(self, generador, relleno=None, respaldo=respuestaLocal,
+                 limiteSuave=LIMITE_SUAVE, limiteDuro=LIMITE_DURO, registrar=None):
+        self.generador = generador
+        self.relleno = relleno
+        self.respaldo = respaldo
+        self.registrar = registrar
+        self.limiteSuave = limiteSuave
+        self.limiteDuro = limiteDuro
+        self.conteo = {'directo': 0, 'relleno': 0, 'limite': 0, 'error': 0}
+
+    def responder(self, texto):
+        respuesta = self.consultar(texto)
+        # El resultado de una consulta abandonada se pierde con su diccionario, la conversacion
+        # solo recibe lo que se dice en este turno
+        if self.registrar != None:
+            try:
+                self.registrar(texto, respuesta)
+            except Exception as e:
+                print("Error al registrar el turno: " + str(e))
+        return respuesta
+
+    def consultar(self, texto):
+        resultado = {}
+        listo = threading.Event()
+
+        # La consulta a la IA corre en un hilo aparte para poder abandonarla
+        def consultar():
+            try:
+                resultado['respuesta'] = self.generador(texto)
+            except Exception as e:
+                resultado['error'] = e
+            listo.set()
+
+        hilo = threading.Thread(target=consultar)
+        hilo.daemon = True
+        inicio = time.time()
+        hilo.start()
+
+        ## Limite suave: se dice la frase de relleno y se sigue esperando
+        usoRelleno = False
+        if not listo.wait(self.limiteSuave):
+            usoRelleno = True
+            if self.relleno != None:
+                try:
+                    self.relleno()
+                except Exception:
+                    print('Error en frase de relleno')
+            listo.wait(max(0, self.limiteDuro - (time.time() - inicio)))
+
+        ## Limite duro: se abandona la consulta y se responde localmente
+        if not listo.is_set():
+            self.conteo['limite'] += 1
+            print("IA sin respuesta tras %.1fs, se usa respaldo local" % (time.time() - inicio))
+            return self.respaldo(texto)
+
+        if 'error' in resultado:
+            self.conteo['error'] += 1
+            print("Error de IA: " + str(resultado['error']))
+            return self.respaldo(texto)
+
+        if usoRelleno:
+            self.conteo['relleno'] += 1
+        else:
+            self.conteo['directo'] += 1
+        return resultado['respuesta']
+
+    def resumen(self):
+        total = sum(self.conteo.values())
+        if total == 0:
+            return "Planificador: sin turnos"
+        return "Planificador: " + ", ".join(["%s %d (%.0f%%)" % (camino, self.conteo[camino], 100.0 * self.conteo[camino] / total)
+                                             for camino in ['directo', 'relleno', 'limite', 'error']])
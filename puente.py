@@ -0,0 +1,335 @@
+# -*- encoding: UTF-8 -*-
+"""
+Puente entre el proceso de control del NAO (Python 2.7) y el de IA y audio (Python 3)
+    Las ordenes y eventos viajan por un socket Unix, cada mensaje lleva una cabecera
+    fija de struct (tipo, identificador, largo) seguida de una carga JSON
+    El audio no pasa por el socket: se escribe en un anillo de memoria compartida
+    (un archivo en /dev/shm abierto con mmap) y por el socket solo viaja su posicion
+    Funciona igual en Python 2.7 y en Python 3
+"""
+
+# Librerias principales
+from maquina import Ejecutor            # Hilos para atender las solicitudes
+
+# Librerías auxiliares
+import json
+import mmap
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+
+
+"""
+Declaracion de constantes
+    Formato de los mensajes y ubicacion del socket y la memoria compartida
+"""
+CABECERA = struct.Struct("!BII")        # Tipo, identificador y largo de la carga
+AUDIO = struct.Struct("!QIH")           # Posicion en el anillo, largo en bytes y cantidad de canales
+
+SOLICITUD = 1       # Llamado que espera respuesta, carga [ruta, argumentos]
+RESPUESTA = 2       # Respuesta a una solicitud, carga [exito, resultado o error]
+AVISO = 3           # Llamado sin respuesta, carga [ruta, argumentos]
+BLOQUE_AUDIO = 4    # Bloque de audio en el anillo, carga AUDIO
+
+DIRECTORIO_COMPARTIDO = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+RUTA_SOCKET = os.path.join(tempfile.gettempdir(), "nao_puente.sock")
+RUTA_AUDIO = os.path.join(DIRECTORIO_COMPARTIDO, "nao_audio")
+CAPACIDAD_AUDIO = 1 << 21   # Bytes del anillo, unos 5 s de los cuatro canales a 48 kHz
+
+
+def codificar(datos):
+    return json.dumps(datos).encode('utf-8')
+
+
+def decodificar(carga):
+    datos = json.loads(carga.decode('utf-8'))
+    if str is bytes:
+        # En Python 2.7 los textos se pasan a str en UTF-8, como los espera NAOqi y el Plan B
+        return aUtf8(datos)
+    return datos
+
+
+def aUtf8(datos):
+    if isinstance(datos, type(u'')):
+        return datos.encode('utf-8')
+    if isinstance(datos, list):
+        return [aUtf8(dato) for dato in datos]
+    if isinstance(datos, dict):
+        return dict([(aUtf8(llave), aUtf8(valor)) for llave, valor in datos.items()])
+    return datos
+
+
+class AnilloAudio():
+    """
+    Anillo de bytes en memoria compartida, un proceso escribe y el otro lee
+    ...
+    Atributos
+    ----------
+    capacidad : int
+        Bytes de audio que caben en el anillo
+    total : int
+        Bytes reservados desde la creacion, se guarda al inicio del archivo para que el lector
+        detecte si un bloque fue sobrescrito antes de leerlo
+
+    Metodos
+    -------
+    escribir(datos)
+        Escribe un bloque y retorna su posicion
+    reservar(largo)
+        Publica el nuevo total antes de copiar, retorna la posicion del bloque
+    copiar(posicion, datos)
+        Copia un bloque reservado al anillo
+    leer(posicion, largo)
+        Lee un bloque, retorna None si ya fue sobrescrito
+    cerrar(borrar=False)
+        Libera la memoria, el escritor borra el archivo
+    """
+    TOTAL = struct.Struct("!Q")
+
+    def __init__(self, ruta=RUTA_AUDIO, capacidad=CAPACIDAD_AUDIO, crear=False):
+        """
+        Parametros
+        ----------
+        ruta : str
+            Archivo de memoria compartida
+        capacidad : int
+            Bytes del anillo, solo se usa al crearlo
+        crear : bool
+            True en el proceso que escribe, crea el archivo con su tamano
+        """
+        self.ruta = ruta
+        if crear:
+            with open(ruta, 'wb') as archivo:
+                archivo.truncate(self.TOTAL.size + capacidad)
+        self.archivo = open(ruta, 'r+b')
+        self.mapa = mmap.mmap(self.archivo.fileno(), 0)
+        self.capacidad = len(self.mapa) - self.TOTAL.size
+        self.total = self.TOTAL.unpack_from(self.mapa, 0)[0]
+
+    def escribir(self, datos):
+        posicion = self.reservar(len(datos))
+        self.copiar(posicion, datos)
+        return posicion
+
+    def reservar(self, largo):
+        # El total se publica antes de copiar, como un seqlock: un lector que termina de leer
+        # mientras se sobrescribe su bloque ya ve el nuevo total y descarta lo que leyo
+        posicion = self.total
+        self.total += largo
+        self.TOTAL.pack_into(self.mapa, 0, self.total)
+        return posicion
+
+    def copiar(self, posicion, datos):
+        inicio = posicion % self.capacidad + self.TOTAL.size
+        primero = min(len(datos), self.capacidad - (inicio - self.TOTAL.size))
+        self.mapa[inicio:inicio + primero] = datos[:primero]
+        if primero < len(datos):
+            self.mapa[self.TOTAL.size:self.TOTAL.size + len(datos) - primero] = datos[primero:]
+
+    def leer(self, posicion, largo):
+        inicio = posicion % self.capacidad + self.TOTAL.size
+        primero = min(largo, self.capacidad - (inicio - self.TOTAL.size))
+        datos = self.mapa[inicio:inicio + primero]
+        if primero < largo:
+            datos += self.mapa[self.TOTAL.size:self.TOTAL.size + largo - primero]
+        # Si el escritor reservo espacio sobre el bloque antes o mientras se leia, ya no es valido
+        if self.TOTAL.unpack_from(self.mapa, 0)[0] - posicion > self.capacidad:
+            return None
+        return datos
+
+    def cerrar(self, borrar=False):
+        self.mapa.close()
+        self.archivo.close()
+        if borrar and os.path.exists(self.ruta):
+            os.remove(self.ruta)
+
+
+class Puente():
+    """
+    Llamados entre procesos por un socket Unix
+    ...
+    Atributos
+    ----------
+    conexion : socket
+        Socket conectado con el otro proceso
+    objetos : dict
+        Objetos y funciones que el otro proceso puede llamar, por nombre
+        La ruta 'nao.efectos.estado' llama objetos['nao'].efectos.estado
+    alAudio : function
+        Recibe (posicion, largo, canales) de cada bloque de audio del anillo
+    ejecutor : Ejecutor
+        Hilos donde corren las solicitudes, los avisos y el audio se atienden en el hilo lector
+    cerrado : threading.Event
+        Se activa cuando el otro proceso cierra la conexion
+
+    Metodos
+    -------
+    llamar(ruta, *argumentos)
+        Ejecuta la ruta en el otro proceso y espera su resultado
+    notificar(ruta, *argumentos)
+        Ejecuta la ruta en el otro proceso sin esperar
+    enviarAudio(posicion, largo, canales)
+        Avisa de un bloque de audio escrito en el anillo
+    cerrar()
+        Cierra la conexion
+    """
+    def __init__(self, conexion, objetos=None, trabajadores=4):
+        self.conexion = conexion
+        self.objetos = objetos if objetos != None else {}
+        self.alAudio = None
+        self.ejecutor = Ejecutor(trabajadores)
+        self.cerrado = threading.Event()
+        self.candadoEnvio = threading.Lock()
+        self.candado = threading.Lock()
+        self.pendientes = {}
+        self.siguiente = 0
+        hilo = threading.Thread(target=self.atender)
+        hilo.daemon = True
+        hilo.start()
+
+    def enviar(self, tipo, identificador, carga):
+        with self.candadoEnvio:
+            self.conexion.sendall(CABECERA.pack(tipo, identificador, len(carga)) + carga)
+
+    def recibirExacto(self, cantidad):
+        partes = []
+        while cantidad > 0:
+            parte = self.conexion.recv(min(cantidad, 1 << 16))
+            if len(parte) == 0:
+                raise EOFError("Conexion cerrada")
+            partes.append(parte)
+            cantidad -= len(parte)
+        return b"".join(partes)
+
+    def llamar(self, ruta, *argumentos):
+        listo = threading.Event()
+        with self.candado:
+            if self.cerrado.is_set():
+                raise EOFError("Conexion cerrada")
+            self.siguiente = (self.siguiente + 1) & 0xFFFFFFFF
+            identificador = self.siguiente
+            self.pendientes[identificador] = [listo, None]
+        self.enviar(SOLICITUD, identificador, codificar([ruta, argumentos]))
+        # Sin limite de tiempo: en Python 2.7 wait(timeout) revisa cada 50 ms y agregaria esa latencia
+        listo.wait()
+        with self.candado:
+            exito, resultado = self.pendientes.pop(identificador)[1]
+        if not exito:
+            raise RuntimeError("Error remoto en %s: %s" % (ruta, resultado))
+        return resultado
+
+    def notificar(self, ruta, *argumentos):
+        self.enviar(AVISO, 0, codificar([ruta, argumentos]))
+
+    def enviarAudio(self, posicion, largo, canales):
+        self.enviar(BLOQUE_AUDIO, 0, AUDIO.pack(posicion, largo, canales))
+
+    def resolver(self, ruta):
+        partes = ruta.split('.')
+        objeto = self.objetos[partes[0]]
+        for parte in partes[1:]:
+            objeto = getattr(objeto, parte)
+        return objeto
+
+    def responder(self, identificador, ruta, argumentos):
+        funcion = lambda: self.resolver(ruta)(*argumentos)
+
+        def alTerminar(resultado, error):
+            if error != None:
+                carga = codificar([False, "%s: %s" % (type(error).__name__, error)])
+            else:
+                try:
+                    carga = codificar([True, resultado])
+                except TypeError:
+                    carga = codificar([True, None])     # El resultado no se puede enviar, solo se confirma
+            try:
+                self.enviar(RESPUESTA, identificador, carga)
+            except socket.error:
+                pass
+        self.ejecutor.enviar(funcion, alTerminar)
+
+    def atender(self):
+        try:
+            while True:
+                tipo, identificador, largo = CABECERA.unpack(self.recibirExacto(CABECERA.size))
+                carga = self.recibirExacto(largo)
+                if tipo == BLOQUE_AUDIO:
+                    if self.alAudio != None:
+                        self.alAudio(*AUDIO.unpack(carga))
+                elif tipo == RESPUESTA:
+                    with self.candado:
+                        pendiente = self.pendientes.get(identificador)
+                    if pendiente != None:
+                        pendiente[1] = decodificar(carga)
+                        pendiente[0].set()
+                elif tipo == SOLICITUD:
+                    ruta, argumentos = decodificar(carga)
+                    self.responder(identificador, ruta, argumentos)
+                elif tipo == AVISO:
+                    ruta, argumentos = decodificar(carga)
+                    try:
+                        self.resolver(ruta)(*argumentos)
+                    except Exception as e:
+                        print("Error en aviso %s: %s" % (ruta, e))
+        except (EOFError, socket.error):
+            pass
+        # Se liberan los llamados que esperan una respuesta que ya no llegara
+        with self.candado:
+            self.cerrado.set()
+            for pendiente in self.pendientes.values():
+                if pendiente[1] == None:
+                    pendiente[1] = [False, "Conexion cerrada"]
+                    pendiente[0].set()
+        self.ejecutor.detener()
+
+    def cerrar(self):
+        try:
+            self.conexion.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self.conexion.close()
+        self.cerrado.wait(1.0)
+        # En Python 2.7 los hilos que siguen vivos al salir del interprete imprimen errores
+        for hilo in self.ejecutor.hilos:
+            if hilo is not threading.current_thread():
+                hilo.join(1.0)
+
+
+def escuchar(ruta=RUTA_SOCKET):
+    """
+    Crea el socket Unix del proceso servidor y espera la conexion del otro proceso
+
+    Retorna el socket conectado
+    """
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    servidor = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    servidor.bind(ruta)
+    servidor.listen(1)
+    try:
+        conexion, direccion = servidor.accept()
+    finally:
+        servidor.close()
+        os.remove(ruta)
+    return conexion
+
+
+def conectar(ruta=RUTA_SOCKET, intentos=50):
+    """
+    Se conecta al socket Unix del proceso servidor, reintenta mientras este se inicia
+
+    Retorna el socket conectado
+    """
+    for intento in range(intentos):
+        conexion = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conexion.connect(ruta)
+            return conexion
+        except socket.error:
+            conexion.close()
+            if intento == intentos - 1:
+                raise
+            time.sleep(0.2)
@@ -0,0 +1,209 @@
+# -*- encoding: UTF-8 -*-
+"""
+Reconocimiento de voz incremental
+    Corta el audio en segmentos en las pausas cortas del usuario y transcribe cada
+    segmento en un hilo aparte mientras el usuario sigue hablando
+    Al terminar de hablar solo falta transcribir el ultimo segmento, por lo que el
+    texto final esta listo poco despues del fin de la voz
+"""
+
+# Librerias principales
+import speech_recognition as sr     # Reconocimiento de voz
+
+# Librerías auxiliares
+import audioop
+import collections
+import threading
+import time
+
+
+class FuenteAudio(sr.AudioSource):
+    """
+    Describe el formato de un audio PCM crudo, para poder convertirlo con sr.Recognizer
+    ...
+    Atributos
+    ----------
+    RATE : int
+        Frecuencia de muestreo en Hz
+    SAMPLE_WIDTH : int
+        Bytes por muestra
+    CHANNELS : int
+        Cantidad de canales
+    CHUNK : int
+        Cantidad de muestras por bloque
+    """
+    def __init__(self, rate, ancho=2, canales=1, chunk=1024):
+        self.RATE = rate
+        self.SAMPLE_WIDTH = ancho
+        self.CHANNELS = canales
+        self.CHUNK = chunk
+
+
+class ReconocedorIncremental():
+    """
+    Clase que transcribe el audio por segmentos mientras se captura
+    ...
+    Atributos
+    ----------
+    recognizer : sr.Recognizer
+        Reconocedor de voz, se usa su umbral de energia y su conexion al API
+    fuente : sr.AudioSource
+        Formato del audio que se agrega, puede ser el sr.Microphone o una FuenteAudio
+    pausaSegmento : float
+        Segundos de silencio que cierran un segmento
+    minimoSegmento : float
+        Duracion minima de un segmento antes de poder cortarlo
+    maximoSegmento : float
+        Duracion maxima de un segmento, se corta aunque no haya pausa
+    parcial : list
+        Textos de los segmentos transcritos hasta el momento
+
+    Metodos
+    -------
+    iniciar()
+        Limpia el estado e inicia el hilo de transcripcion
+    agregar(datos)
+        Agrega un bloque de audio PCM y corta el segmento si hay una pausa
+    silencio()
+        Segundos de silencio desde la ultima voz detectada
+    escuchar(source, timeout)
+        Lee el microfono por bloques hasta que el usuario termina de hablar
+    transcripcionParcial()
+        Devuelve el texto transcrito hasta el momento
+    finalizar()
+        Transcribe el ultimo segmento y devuelve el texto completo
+    """
+    FIN = None
+
+    def __init__(self, recognizer, fuente, pausaSegmento=0.35, minimoSegmento=1.0, maximoSegmento=6.0):
+        self.recognizer = recognizer
+        self.fuente = fuente
+        self.pausaSegmento = pausaSegmento
+        self.minimoSegmento = minimoSegmento
+        self.maximoSegmento = maximoSegmento
+        self.bytesPorSegundo = float(fuente.RATE * fuente.SAMPLE_WIDTH * fuente.CHANNELS)
+        self.hilo = None
+        self.parcial = []
+
+    def iniciar(self):
+        # Si quedo un hilo de una frase anterior, se termina
+        if self.hilo != None and self.hilo.is_alive():
+            with self.condicion:
+                self.pendientes.append(self.FIN)
+                self.condicion.notify()
+        self.segmento = []
+        self.duracionSegmento = 0.0
+        self.silencioActual = 0.0
+        self.hayVoz = False
+        self.parcial = []
+        self.pendientes = collections.deque()
+        self.condicion = threading.Condition()
+        self.hilo = threading.Thread(target=self.transcribir, args=(self.pendientes, self.condicion, self.parcial))
+        self.hilo.daemon = True
+        self.hilo.start()
+
+    def agregar(self, datos):
+        duracion = len(datos) / self.bytesPorSegundo
+        energia = audioop.rms(datos, self.fuente.SAMPLE_WIDTH)
+
+        if energia > self.recognizer.energy_threshold:
+            self.hayVoz = True
+            self.silencioActual = 0.0
+        else:
+            self.silencioActual += duracion
+
+        self.segmento.append(datos)
+        self.duracionSegmento += duracion
+
+        ## Se corta el segmento en una pausa corta, o si es demasiado largo
+        if self.hayVoz and ((self.silencioActual >= self.pausaSegmento and self.duracionSegmento >= self.minimoSegmento)
+                            or self.duracionSegmento >= self.maximoSegmento):
+            self.cortar()
+
+    def cortar(self):
+        if self.hayVoz and len(self.segmento) > 0:
+            with self.condicion:
+                self.pendientes.append(b"".join(self.segmento))
+                self.condicion.notify()
+        self.segmento = []
+        self.duracionSegmento = 0.0
+        self.hayVoz = False
+
+    def silencio(self):
+        return self.silencioActual
+
+    def escuchar(self, source, timeout=None):
+        """
+        Parametros
+        ----------
+        source : sr.Microphone
+            Microfono abierto
+        timeout : float
+            Segundos maximos de espera a que el usuario empiece a hablar
+
+        Lanza OSError si el usuario no empieza a hablar antes del timeout
+        """
+        self.iniciar()
+        duracionBloque = float(source.CHUNK) / source.RATE
+        previo = collections.deque(maxlen=int(self.pausaSegmento / duracionBloque) + 1)
+        espera = 0.0
+
+        # Se espera a que inicie la voz, guardando un poco de audio previo
+        while True:
+            datos = source.stream.read(source.CHUNK)
+            if len(datos) == 0:
+                break
+            if audioop.rms(datos, source.SAMPLE_WIDTH) > self.recognizer.energy_threshold:
+                for bloque in previo:
+                    self.agregar(bloque)
+                self.agregar(datos)
+                break
+            previo.append(datos)
+            espera += duracionBloque
+            if timeout and espera > timeout:
+                raise OSError("Tiempo de espera agotado")
+
+        # Se agrega audio hasta detectar el fin de la frase
+        while self.silencio() < self.recognizer.pause_threshold:
+            datos = source.stream.read(source.CHUNK)
+            if len(datos) == 0:
+                break
+            self.agregar(datos)
+
+    def transcribir(self, pendientes, condicion, parcial):
+        # Cada frase tiene su propia cola y lista de resultados
+        while True:
+            with condicion:
+                while len(pendientes) == 0:
+                    condicion.wait()
+                datos = pendientes.popleft()
+            if datos is self.FIN:
+                return
+            try:
+                audio = sr.AudioData(self.fuente.RATE, self.recognizer.samples_to_flac(self.fuente, datos))
+                parcial.append(self.recognizer.recognize(audio))
+                print("Parcial: " + " ".join(parcial))
+            except LookupError:
+                pass
+            except Exception as e:
+                print("Error al transcribir segmento: " + str(e))
+
+    def transcripcionParcial(self):
+        return " ".join(self.parcial)
+
+    def finalizar(self):
+        """
+        Retorna el texto completo de la frase
+        Lanza LookupError si no se pudo transcribir ningun segmento, igual que sr.Recognizer
+        """
+        inicio = time.time()
+        self.cortar()
+        with self.condicion:
+            self.pendientes.append(self.FIN)
+            self.condicion.notify()
+        self.hilo.join()
+        print("Transcripcion final en %.2fs" % (time.time() - inicio))
+
+        if len(self.parcial) == 0:
+            raise LookupError("Speech is unintelligible")
+        return self.transcripcionParcial()
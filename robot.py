@@ -0,0 +1,394 @@
+# -*- encoding: UTF-8 -*-
+"""
+Robot NAO y SR de palabras clave, solo requiere la SDK de NAOqi
+    Contiene la parte del Plan B que habla con NAOqi: los parametros de conexion, las
+    palabras clave, la clase NAO y el SR de palabras clave (SpeechTestClass)
+    No importa el SR en linea ni la IA, por lo que el proceso de control (control_nao.py)
+    corre en Python 2.7 solo con NAOqi
+"""
+
+# Librerias principales
+from naoqi import ALProxy, ALModule     # Clases de Naoqi v2.1.4.13
+from efectos import EfectosLeds         # Efectos de leds en segundo plano
+
+# Librerías auxiliares
+import copy
+import tempfile
+import time
+
+"""
+Declaracion de constantes
+    Parametros de conexion: IP y PORT
+    Palabras claves
+"""
+# Parametros de conexión 
+IP = "127.0.0.1"   # IP del robot
+PORT = 58739       # Puerto del robot
+
+#Palabras clave
+PALABRAS_INICIO = "hola;okay;nao;"
+PALABRAS_FIN = "adios;chao;apagar;"
+
+# Definición de clases
+
+"""
+Clase NAO
+    Encargada de representar al robot
+    Ejecuta movimientos, acciones fisicas y enlaza con la memoria del robot
+"""
+class NAO():
+    """
+    Clase que representa al robot NAO y sus acciones
+    ...
+    Atributos 
+    ----------
+    tts : object
+        API Text-to-speech del nao
+    asp : object
+        API Animated text del NAO
+        Permite al robot moverse mientras habla de forma integrada
+    posturas : obj
+        API para adoptar posturas
+    leds : object
+        API que permite controlar leds
+    efectos : EfectosLeds
+        Motor de efectos de leds, ejecuta las animaciones en segundo plano segun el estado
+    alp : object
+        API Autonomous life 
+        Permite configurar el modo vida autónoma del robot
+    adp : object
+        API AudioDevice
+        Permite acceder a los dispositivos de audio, en este caso los micrófonos
+    memory : object
+        API 'ALMemory'
+        Memoria del robot
+    headTouched : bool
+        Almacena el estado de los sensores de cabeza, si han sido tocados o no
+    handTouched : bool
+        Almacena el estado de los sensores de las manos, si han sido tocados o no
+    audioFile : path str
+        Localizacion del archivo de audio en la memoria temporal
+    
+
+    Metodos
+    -------
+    iniciar()
+        Inicializa el robot:
+            Configura idioma del TTS a español
+            Adopta posición StandInit para activar robot
+            Adopta posición Crouch
+    saludo()
+        El robot pasa al modo escucha activa:
+            Adopta posición StandInit
+            Inicia vida autónoma
+            Dice el mensaje de bienvenida
+    despedida()
+        El robot se despide:
+            Dice texto de despedida
+            Adopta posición Crouch
+    pensar()
+        El robot dice una frase de relleno sin bloquear, mientras espera la respuesta de la IA
+    generar(texto, generador)
+        Genera la respuesta al texto con el generador, sin decirla
+    decir(respuesta)
+        El robot dice la respuesta con el efecto de leds 'hablando'
+    updateHandTouch()
+        Verifica en la memoria si el usuario tocó alguno de los sensores de las manos del robot
+    updateHeadTouch()
+        Verifica en la memoria si el usuario tocó alguno de los sensores de la cabeza del robot
+    startRecord()
+        Iniciar grabación con el micrófono del nao
+    stopRecord()
+        Finalizar grabación
+    speechStopped()
+        Verifica en la memoria si el estado del speech recognition indica que el usuario dijo una frase y terminó de hablar
+    """
+
+
+    def __init__(self, ip_nao=None, port_nao=None):
+        """
+        Parametros
+        ----------
+        ip_nao : str
+            IP del robot, en formato string
+            Con None se usan proxies locales del broker, cuando el codigo corre en el robot
+        port_nao : int
+            Numero de puerto del robot
+        """
+        direccion = () if ip_nao == None else (ip_nao, port_nao)
+        self.tts = ALProxy("ALTextToSpeech", *direccion)
+        self.asp = ALProxy("ALAnimatedSpeech", *direccion)
+        self.posturas = ALProxy("ALRobotPosture", *direccion)
+        self.leds = ALProxy("ALLeds", *direccion)
+        self.efectos = EfectosLeds(self.leds)
+        self.alp = ALProxy("ALAutonomousLife", *direccion)
+        self.adp = ALProxy("ALAudioDevice", *direccion)
+        self.memory = ALProxy("ALMemory", *direccion)
+        self.headTouched = False
+        self.handTouched = False
+        self.audioFile = tempfile.mkdtemp() + "\\rec.wav"
+
+    def iniciar(self):
+        self.tts.setLanguage("Spanish")
+        self.posturas.goToPosture("StandInit",0.5)
+        time.sleep(1)
+        self.posturas.goToPosture("Crouch",0.5)
+        time.sleep(1)
+        ##implementar sonido beep
+
+    def saludo(self):
+        self.efectos.estado('hablando')
+        self.posturas.goToPosture("StandInit",0.5)
+        time.sleep(1)
+        self.alp.setState("solitary")
+        time.sleep(0.5)
+        self.asp.say(" ^start(animations/Stand/Gestures/Hey_6) Hola, ^wait(animations/Stand/Gestures/Hey_6)"
+                     " ^start(animations/Stand/Gestures/Me_1) soy NAO, tu asistente, preguntame lo que quieras"
+                     " y te ayudaré ^wait(animations/Stand/Gestures/Me_1) ")
+        print("Hola, soy NAO, tu asistente, preguntame lo que quieras y te ayudare")
+        time.sleep(1)
+
+    def despedida(self):
+        self.asp.say(" ^start(animations/Stand/Gestures/Hey_1) Adiós. Si quieres llamarme di: Hola Nao y te ayudaré."
+                     " ^wait(animations/Stand/Gestures/Hey_1)")
+        print("Adios. Si quieres llamarme di HOLA NAO y te ayudare.")
+        time.sleep(0.5)
+        self.posturas.goToPosture("Crouch",0.5)
+        time.sleep(1)
+
+    def pensar(self):
+        self.tts.post.say("Déjame pensar...")
+
+    def generar(self, texto, generador):
+        if type(texto) == str:
+            return generador(texto).strip()
+        else:
+            return generador((texto.encode('utf-8'))).strip()
+
+    def decir(self, respuesta):
+        self.efectos.estado('hablando')
+        if type(respuesta) == str:
+            print(respuesta)
+            self.asp.say(respuesta, {"bodyLanguageMode":"random"})
+        else:
+            print(respuesta)
+            self.asp.say(respuesta.encode(('utf-8')), {"bodyLanguageMode":"random"})
+
+
+    def updateHandTouch(self):
+        self.handTouched = (self.memory.getData("HandRightBackTouched") 
+                            or self.memory.getData("HandRightLeftTouched") 
+                            or self.memory.getData("HandRightRightTouched")
+                            or self.memory.getData("HandLeftBackTouched") 
+                            or self.memory.getData("HandLeftLeftTouched")
+                            or self.memory.getData("HandLeftRightTouched"))
+        return self.handTouched
+        
+    def updateHeadTouch(self):
+        self.headTouched = (self.memory.getData("FrontTactilTouched") 
+                            or self.memory.getData("MiddleTactilTouched") 
+                            or self.memory.getData("RearTactilTouched"))
+        return self.headTouched
+    
+    def startRecord(self):
+        self.adp.startMicrophonesRecording(self.audioFile)
+
+    def stopRecord(self):
+        self.adp.stopMicrophonesRecording()
+
+    def speechStopped(self):
+        try:
+            return (self.memory.getData("ALSpeechRecognition/Status") == "EndOfProcess" 
+                    or self.memory.getData("ALSpeechRecognition/Status") == "Stop")
+        except Exception:
+            return False
+
+"""
+Clase SpeechTestClass que hereda de ALModule.
+    Representa al reconocimiento de voz, con sus módulos y funciones
+"""
+class SpeechTestClass(ALModule):
+    """
+Definicion de constantes de clase
+Estas variables controlan aspectos como las palabras clave, la expresión visual y auditiva y el umbral de confianza para la detección de palabras.
+"""
+    VISUAL_EXPRESSION = True
+    AUDIO_EXPRESSION = True
+    ENABLE_WORD_SPOTTING = True
+    CONFIDENCE_THRESHOLD = 25
+    
+    lastWords = None
+    alReconocer = None
+    """
+Se inicializa el módulo de reconocimiento de voz (self.asr) y configura el idioma en espanol.
+Se enlaza con un objeto para acceder a la memoria del robot (self.memory).
+...
+    Atributos 
+    ----------
+    asr : str
+        IP del robot, en formato string
+    memory : obj
+        nao.memory, memoria del nao
+    word_list : str 
+        Nombre de la instancia de clase
+    alReconocer : function
+        Funcion sin parametros que se llama al reconocer una palabra clave, permite esperar sin consultar la memoria
+    
+
+    Metodos
+    -------
+    Consultar documentacion de ALSpeechRecognition  
+    precargar(vocabulario=None)
+        Carga el vocabulario una sola vez al inicio y se suscribe a WordRecognized, el SR queda en pausa
+        ALSpeechRecognition tiene un solo vocabulario activo, por eso se carga la union de las listas
+        y cada instancia solo reacciona a las palabras de su word_list
+    armar()
+        Activa la deteccion de palabras de la instancia, solo quita la pausa del SR
+    desarmar()
+        Desactiva la deteccion de palabras y pausa el SR
+"""
+    def __init__(self, IP, PORT, name, memory, word_list):
+        """
+        Parametros
+        ----------
+        IP : str
+            IP del robot, en formato string, con None se usa el proxy local del broker
+        PORT : int
+            Numero de puerto del robot
+        name : str 
+            Nombre de la instancia de clase
+        memory : NAO.memory
+            Memoria del robot nao, instancia de ALProxy('ALMemory')
+        word_list : lista
+            Lista de palabras que se utilizarán para el Speech recognition
+            
+        """
+
+        ALModule.__init__(self, name)
+        try:
+            self.asr = ALProxy("ALSpeechRecognition", *(() if IP == None else (IP, PORT)))
+            self.asr.setLanguage("Spanish")
+        except Exception as e:
+            self.asr = None
+            self.logger.error(e)
+        self.memory = memory
+        self.word_list = word_list
+    
+    def onLoad(self):
+        from threading import Lock
+        self.bIsRunning = False
+        self.mutex = Lock()
+        self.hasPushed = False
+        self.hasSubscribed = False
+        self.BIND_PYTHON(self.getName(), "onWordRecognized")
+        
+        self.isWordSaid = False
+        self.activo = False
+        self.tiempoArmado = None
+
+    def onUnload(self):
+        from threading import Lock
+        self.mutex.acquire()
+        try:
+            if (self.bIsRunning):
+                if (self.hasSubscribed):
+                    self.memory.unsubscribeToEvent("WordRecognized", self.getName())
+                if (self.hasPushed and self.asr):
+                    self.asr.pause(True)
+                    self.asr.popContexts()
+        except RuntimeError as e:
+            self.mutex.release()
+            raise e
+        self.bIsRunning = False
+        self.mutex.release()
+
+    def onInput_onStart(self):
+        from threading import Lock
+        self.mutex.acquire()
+        
+        self.asr.pause(True)
+        if self.bIsRunning:
+            self.mutex.release()
+            return
+        self.bIsRunning = True
+        try:
+            if self.asr:
+                self.asr.setVisualExpression(self.VISUAL_EXPRESSION)
+                self.asr.setAudioExpression(self.AUDIO_EXPRESSION)
+                self.asr.pushContexts()
+            self.hasPushed = True
+            if self.asr:
+                self.asr.setVocabulary(self.word_list.split(';'), self.ENABLE_WORD_SPOTTING)
+            self.memory.subscribeToEvent("WordRecognized", self.getName(), "onWordRecognized")
+            self.hasSubscribed = True
+        except RuntimeError as e:
+            self.mutex.release()
+            self.onUnload()
+            raise e
+        self.activo = True
+        self.mutex.release()
+        self.asr.pause(False)
+
+    def onInput_onStop(self):
+        if self.bIsRunning:
+            self.onUnload()
+
+    def precargar(self, vocabulario=None):
+        self.mutex.acquire()
+        inicio = time.time()
+        try:
+            # Compilar el vocabulario en el NAO toma segundos, solo se hace una vez
+            if vocabulario != None and self.asr:
+                self.asr.pause(True)
+                self.asr.setVisualExpression(self.VISUAL_EXPRESSION)
+                self.asr.setAudioExpression(self.AUDIO_EXPRESSION)
+                self.asr.pushContexts()
+                self.hasPushed = True
+                self.asr.setVocabulary([palabra for palabra in vocabulario.split(';') if palabra != ""],
+                                       self.ENABLE_WORD_SPOTTING)
+            self.memory.subscribeToEvent("WordRecognized", self.getName(), "onWordRecognized")
+            self.hasSubscribed = True
+            self.bIsRunning = True
+        finally:
+            self.mutex.release()
+        print("%s: vocabulario precargado en %.0f ms" % (self.getName(), (time.time() - inicio) * 1000))
+
+    def armar(self):
+        inicio = time.time()
+        self.isWordSaid = False
+        self.lastWords = None
+        self.activo = True
+        if self.asr:
+            self.asr.pause(False)
+        self.tiempoArmado = time.time() - inicio
+        print("%s: SR armado en %.0f ms" % (self.getName(), self.tiempoArmado * 1000))
+
+    def desarmar(self):
+        self.activo = False
+        if self.asr:
+            self.asr.pause(True)
+
+    def onWordRecognized(self, key, value, message):
+        # Con el vocabulario precargado, se ignoran las palabras de las otras instancias
+        if self.activo == False or not any([palabra in value[0] for palabra in self.word_list.split(';') if palabra != ""]):
+            return
+        if len(value) > 1 and value[1] >= self.CONFIDENCE_THRESHOLD / 100.:
+            self.lastWords = copy.copy(value)
+            self.wordRecognized(value[0])
+        else:
+            self.onNothing()
+
+    def onNothing(self):
+        print("No se reconoce palabra clave")
+        
+    def wordRecognized(self, wordRecognized):
+        self.isWordSaid = True
+        print(wordRecognized)
+        if self.alReconocer != None:
+            self.alReconocer()
+        
+    def getWords(self):
+        return self.lastWords
+        
+    def isSearchedWordSaid(self):
+        return self.isWordSaid
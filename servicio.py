@@ -0,0 +1,183 @@
+# -*- encoding: UTF-8 -*-
+"""
+Modo servicio: la conversacion corre en el robot, como un modulo de NAOqi
+    Se conecta al broker local del robot y usa proxies locales, por lo que los llamados
+    a NAOqi no cruzan la red. Solo las consultas HTTP del SR y de la IA salen del robot
+    Los toques y las palabras clave llegan como eventos de ALMemory (subscribeToEvent),
+    sin consultar la memoria en un ciclo, y el audio llega por bloques a ReceptorAudio,
+    sin grabar ni leer un archivo
+    Al terminar una conversacion el servicio vuelve a la espera, hasta que se diga 'apagar'
+
+    Con --simular se usa naoqi_falso.py, para probar el servicio en una computadora con Linux
+
+Uso en el robot (o con autoload.ini, que pasa --pip y --pport):
+    python servicio.py
+Uso en una computadora:
+    python servicio.py --simular [--audio pregunta.wav]
+"""
+
+# Librerías auxiliares
+import argparse
+import sys
+import threading
+import time
+
+# Con --simular el modulo naoqi se reemplaza antes de importar los planes
+if __name__ == "__main__" and "--simular" in sys.argv:
+    import naoqi_falso
+    sys.modules['naoqi'] = naoqi_falso
+
+# Librerias principales
+import speech_recognition as sr         # Reconocimiento de voz
+from naoqi import ALBroker, ALModule    # Clases de Naoqi v2.1.4.13
+from planificador import Planificador   # Limites de tiempo por turno
+from reconocimiento import ReconocedorIncremental, FuenteAudio # SR por segmentos mientras se habla
+from conversacion import Conversacion, EVENTOS_CABEZA, EVENTOS_MANOS, EVENTO_ESTADO_SR # Acciones de cada estado
+from ia import IA, CONTEXTO             # Conexion con GPT, con control de consumo, y contexto de NAO
+from enrutador import Enrutador         # Motor y tokens por nivel de pregunta
+from robot import NAO, SpeechTestClass, PALABRAS_INICIO, PALABRAS_FIN # Robot y SR de palabras clave
+from IA_PlanB_MicNao import ReceptorAudio # Audio por bloques con beamformer
+
+
+"""
+Clase ServicioConversacion que hereda de ALModule y de Conversacion.
+    Ejecuta la conversacion dentro del robot, los eventos de ALMemory llegan a sus callbacks
+"""
+class ServicioConversacion(ALModule, Conversacion):
+    """
+    Modulo de NAOqi con la conversacion completa, reutiliza las clases del Plan B y de robot.py
+    Las acciones de cada estado estan en Conversacion, este modulo recibe los eventos
+    ...
+    Metodos
+    -------
+    suscribir()
+        Se suscribe a los eventos de toques y del SR
+    desuscribir()
+        Cancela las suscripciones
+    onTocarCabeza(key, value, message), onTocarMano(key, value, message), onEstadoSR(key, value, message)
+        Callbacks de ALMemory
+    """
+    def __init__(self, name, nao, planificador, inicio, fin, receptor):
+        """
+        Parametros
+        ----------
+        name : str
+            Nombre del modulo, debe ser igual al de la variable global que lo contiene
+        nao : NAO
+            Robot, creado con proxies locales
+        planificador : Planificador
+            Planificador con IA.generar como generador e IA.recordar como registro
+        inicio : SpeechTestClass
+            SR de las palabras de inicio, con el vocabulario precargado
+        fin : SpeechTestClass
+            SR de las palabras de fin
+        receptor : ReceptorAudio
+            Receptor de audio del SR incremental
+        """
+        ALModule.__init__(self, name)
+        Conversacion.__init__(self, nao, planificador, inicio, fin, receptor)
+
+    def suscribir(self):
+        for evento in EVENTOS_CABEZA:
+            self.nao.memory.subscribeToEvent(evento, self.getName(), "onTocarCabeza")
+        for evento in EVENTOS_MANOS:
+            self.nao.memory.subscribeToEvent(evento, self.getName(), "onTocarMano")
+        self.nao.memory.subscribeToEvent(EVENTO_ESTADO_SR, self.getName(), "onEstadoSR")
+
+    def desuscribir(self):
+        for evento in EVENTOS_CABEZA + EVENTOS_MANOS + [EVENTO_ESTADO_SR]:
+            try:
+                self.nao.memory.unsubscribeToEvent(evento, self.getName())
+            except RuntimeError:
+                print('Error al cancelar suscripcion a ' + evento)
+
+    def onTocarCabeza(self, key, value, message):
+        """Evento de ALMemory al tocar un sensor de la cabeza"""
+        if value > 0:
+            self.tocarCabeza()
+
+    def onTocarMano(self, key, value, message):
+        """Evento de ALMemory al tocar un sensor de las manos"""
+        if value > 0:
+            self.tocarMano()
+
+    def onEstadoSR(self, key, value, message):
+        """Evento de ALMemory con el estado del SR"""
+        self.cambiarEstadoSR(value)
+
+
+"""
+Codigo principal
+MAIN
+
+Se conecta al broker local, se crean los modulos con proxies locales y se atienden conversaciones
+hasta que se diga 'apagar' o se interrumpa el proceso
+"""
+
+def main():
+    # Los modulos de NAOqi deben ser variables globales con el mismo nombre del modulo
+    global ServicioConversacion, SpeechTestClass, SpeechRecClass, ReceptorAudio
+
+    parser = argparse.ArgumentParser(description="Conversacion con IA como servicio de NAOqi en el robot")
+    parser.add_argument("--pip", default="127.0.0.1", help="IP del broker de NAOqi, en el robot es el local")
+    parser.add_argument("--pport", type=int, default=9559, help="Puerto del broker de NAOqi")
+    parser.add_argument("--simular", action="store_true", help="Usar NAOqi simulado (naoqi_falso.py)")
+    parser.add_argument("--audio", help="Con --simular, archivo WAV que se envia como audio de cada pregunta")
+    argumentos = parser.parse_args()
+
+    # El broker propio permite recibir eventos, los proxies sin IP se resuelven en el robot
+    broker = ALBroker("servicioBroker", "0.0.0.0", 0, argumentos.pip, argumentos.pport)
+    if argumentos.simular:
+        naoqi_falso.AUDIO = argumentos.audio
+
+    ###Inicializar clases
+    nao = NAO()
+    ia = IA(CONTEXTO, enrutador=Enrutador())
+    planificador = Planificador(ia.generar, nao.pensar, registrar=ia.recordar)
+    recognizer = sr.Recognizer("es-CR")
+    recognizer.pause_threshold = 1.5
+
+    SpeechRecClass = SpeechTestClass(None, None, 'SpeechRecClass', nao.memory, PALABRAS_FIN)
+    SpeechTestClass = SpeechTestClass(None, None, 'SpeechTestClass', nao.memory, PALABRAS_INICIO)
+    reconocedor = ReconocedorIncremental(recognizer, FuenteAudio(ReceptorAudio.FRECUENCIA))
+    ReceptorAudio = ReceptorAudio('ReceptorAudio', nao.adp, reconocedor)
+
+    SpeechTestClass.onLoad()
+    SpeechRecClass.onLoad()
+    SpeechTestClass.precargar(PALABRAS_INICIO + PALABRAS_FIN)
+    SpeechRecClass.precargar()
+
+    ServicioConversacion = ServicioConversacion('ServicioConversacion', nao, planificador,
+                                                SpeechTestClass, SpeechRecClass, ReceptorAudio)
+    ServicioConversacion.suscribir()
+    nao.iniciar()
+
+    if argumentos.simular:
+        naoqi_falso.Consola().start()
+        print("Ordenes: hola, adios, apagar, cabeza, mano, fin, pausa N")
+
+    # Las conversaciones corren en otro hilo para que Ctrl+C detenga el servicio
+    hilo = threading.Thread(target=ServicioConversacion.correr)
+    hilo.daemon = True
+    hilo.start()
+    try:
+        while hilo.is_alive():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Interrumpido, deteniendo el servicio")
+
+    # Fin del servicio
+    ServicioConversacion.desuscribir()
+    SpeechRecClass.onUnload()
+    SpeechTestClass.onUnload()
+    nao.efectos.detener()
+    nao.posturas.goToPosture('Crouch', 0.5)
+    print(planificador.resumen())
+    print(ia.contabilidad.resumen())
+    print(ia.enrutador.resumen())
+    broker.shutdown()
+    print("SERVICIO FINALIZADO")
+
+
+if __name__ == "__main__":
+    main()
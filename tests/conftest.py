@@ -0,0 +1,9 @@
+# -*- encoding: UTF-8 -*-
+"""
+Configuracion de pytest: los modulos del proyecto estan en la raiz del repositorio
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,55 @@
+# -*- encoding: UTF-8 -*-
+"""
+Pruebas de CubetaTokens, el control de admision de la IA
+"""
+
+from consumo import CubetaTokens
+
+import time
+
+
+def test_tomar_sin_esperar():
+    cubeta = CubetaTokens(60, capacidad=3)
+    assert cubeta.tomar(2)
+    assert not cubeta.tomar(2)      # Solo queda un token y no se espera
+    assert cubeta.tomar(1)
+
+
+def test_rechazo_no_consume():
+    cubeta = CubetaTokens(60, capacidad=5)
+    cubeta.tomar(4)
+    assert not cubeta.tomar(3, esperaMaxima=0.01)
+    assert cubeta.disponibles < 1.5
+
+
+def test_tomar_esperando_el_relleno():
+    cubeta = CubetaTokens(600, capacidad=1)     # 10 tokens por segundo
+    assert cubeta.tomar(1)
+    inicio = time.time()
+    assert cubeta.tomar(1, esperaMaxima=1.0)
+    assert 0.05 < time.time() - inicio < 0.5
+
+
+def test_cantidad_mayor_a_la_capacidad():
+    # Una solicitud mas grande que la cubeta se limita a la capacidad en lugar de no pasar nunca
+    cubeta = CubetaTokens(60, capacidad=10)
+    assert cubeta.tomar(50)
+    assert cubeta.disponibles < 1
+
+
+def test_devolver():
+    cubeta = CubetaTokens(60, capacidad=10)
+    cubeta.tomar(8)
+    cubeta.devolver(5)
+    assert 7 <= cubeta.disponibles < 7.5
+    cubeta.devolver(100)
+    assert cubeta.disponibles == 10
+
+
+def test_tomar_sin_espera_maxima():
+    # Con None se espera el relleno el tiempo que haga falta, como en el reprocesamiento por lotes
+    cubeta = CubetaTokens(600, capacidad=2)     # 10 tokens por segundo
+    assert cubeta.tomar(2)
+    inicio = time.time()
+    assert cubeta.tomar(2, esperaMaxima=None)
+    assert 0.15 < time.time() - inicio < 0.6
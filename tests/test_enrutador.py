@@ -0,0 +1,75 @@
+# -*- encoding: UTF-8 -*-
+"""
+Pruebas de la clasificacion de preguntas y de la eleccion de motor del Enrutador
+"""
+
+from enrutador import clasificar, Enrutador, NIVELES, LATENCIA_ERROR
+
+import pytest
+
+
+@pytest.mark.parametrize("pregunta, nivel", [
+    (u"¿Cómo te llamas?", 'corto'),
+    (u"¿Dónde estás?", 'corto'),
+    (u"¿Qué estás haciendo ahora mismo?", 'corto'),
+    (u"¿Sabes que estoy muy feliz de conocerte hoy?", 'normal'),
+    (u"¿Cuál es tu color favorito y tu comida preferida en la feria?", 'normal'),
+    (u"¿Qué es la fotosíntesis?", 'explicacion'),
+    (u"Explícame los volcanes", 'explicacion'),
+    (u"¿Por qué el cielo es azul?", 'explicacion'),
+    (u"¿Cuál es la diferencia entre un virus y una bacteria?", 'explicacion'),
+])
+def test_clasificar(pregunta, nivel):
+    assert clasificar(pregunta) == nivel
+
+
+def test_motores_siguen_instrucciones():
+    for nivel in NIVELES.values():
+        for motor in nivel['motores']:
+            assert "instruct" in motor
+
+
+def test_nivel_preferido_sin_latencias():
+    enrutador = Enrutador()
+    assert enrutador.elegir(u"¿Qué es la fotosíntesis?") == ("gpt-3.5-turbo-instruct", 150, 'explicacion')
+    assert enrutador.desvios == 0
+
+
+def test_motor_lento_baja_un_nivel():
+    # La latencia se mide por nivel: el mismo motor con menos tokens puede seguir dentro del objetivo
+    enrutador = Enrutador()
+    for i in range(10):
+        enrutador.registrar("gpt-3.5-turbo-instruct", 'explicacion', 6.0)
+    assert enrutador.elegir(u"¿Qué es la fotosíntesis?") == ("gpt-3.5-turbo-instruct", 85, 'normal')
+    assert enrutador.elegir(u"¿Cómo te llamas?") == ("gpt-3.5-turbo-instruct", 40, 'corto')
+    assert enrutador.desvios == 1
+
+
+def test_niveles_lentos_bajan_al_nivel_corto():
+    enrutador = Enrutador()
+    for i in range(10):
+        enrutador.registrar("gpt-3.5-turbo-instruct", 'explicacion', 6.0)
+        enrutador.registrar("gpt-3.5-turbo-instruct", 'normal', 3.0)
+    assert enrutador.elegir(u"¿Qué es la fotosíntesis?") == ("gpt-3.5-turbo-instruct", 40, 'corto')
+    assert enrutador.desvios == 1
+
+
+def test_latencia_dentro_del_objetivo_no_desvia():
+    enrutador = Enrutador()
+    for i in range(10):
+        enrutador.registrar("gpt-3.5-turbo-instruct", 'normal', 2.0)
+        enrutador.registrar("gpt-3.5-turbo-instruct", 'explicacion', 2.0)
+    motor, maxTokens, nivel = enrutador.elegir(u"¿Cuál es tu color favorito y tu comida preferida en la feria?")
+    assert (maxTokens, nivel) == (85, 'normal')
+    motor, maxTokens, nivel = enrutador.elegir(u"¿Qué es la fotosíntesis?")
+    assert (maxTokens, nivel) == (150, 'explicacion')
+    assert enrutador.desvios == 0
+
+
+def test_solicitud_fallida_cuenta_como_lenta():
+    # Un error inmediato no debe parecer una respuesta rapida
+    enrutador = Enrutador()
+    for i in range(10):
+        enrutador.registrar("gpt-3.5-turbo-instruct", 'explicacion', 0.01, error=True)
+    assert enrutador.latencias.p95(("gpt-3.5-turbo-instruct", 'explicacion')) == LATENCIA_ERROR
+    assert enrutador.elegir(u"¿Qué es la fotosíntesis?")[2] == 'normal'
@@ -0,0 +1,103 @@
+# -*- encoding: UTF-8 -*-
+"""
+Pruebas de IA sin conexion: openai y env se reemplazan por modulos locales
+"""
+
+import sys
+import types
+
+import pytest
+
+
+class RateLimitError(Exception):
+    pass
+
+
+@pytest.fixture
+def ia(monkeypatch):
+    # Modulos de reemplazo, Completion.create entrega en orden las respuestas o errores de la lista
+    respuestas = []
+
+    def crear(**parametros):
+        respuesta = respuestas.pop(0)
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        return respuesta
+
+    openai = types.ModuleType('openai')
+    openai.error = types.ModuleType('openai.error')
+    openai.error.RateLimitError = RateLimitError
+    openai.Completion = types.SimpleNamespace(create=crear)
+    env = types.ModuleType('env')
+    env.apikey = 'prueba'
+    monkeypatch.setitem(sys.modules, 'openai', openai)
+    monkeypatch.setitem(sys.modules, 'env', env)
+    monkeypatch.delitem(sys.modules, 'ia', raising=False)
+    import ia
+    monkeypatch.setattr(ia.time, 'sleep', lambda segundos: None)
+    return ia, respuestas
+
+
+class Respuesta(dict):
+    # Como la respuesta del API: un diccionario con 'usage' y el atributo choices
+    def __init__(self, texto):
+        dict.__init__(self, usage={'prompt_tokens': 10, 'completion_tokens': 5})
+        self.choices = [types.SimpleNamespace(text=texto)]
+
+
+def test_respuesta_se_guarda_en_conversacion(ia):
+    modulo, respuestas = ia
+    respuestas.append(Respuesta(" Hola, soy NAO. Y"))
+    robot = modulo.IA(modulo.CONTEXTO)
+    assert robot.respuesta("hola") == " Hola, soy NAO."
+    assert robot.conversacion == ["\nPregunta: hola", "\nRespuesta:  Hola, soy NAO."]
+
+
+def test_error_del_api_no_cambia_conversacion_ni_presupuesto(ia):
+    modulo, respuestas = ia
+    respuestas.append(ValueError("sin conexion"))
+    robot = modulo.IA(modulo.CONTEXTO, solicitudesPorMinuto=1, tokensPorMinuto=1000)
+    robot.conversacion = ["\nPregunta: hola", "\nRespuesta: Hola."]
+    with pytest.raises(ValueError):
+        robot.respuesta("como estas")
+    assert robot.conversacion == ["\nPregunta: hola", "\nRespuesta: Hola."]
+    # Lo tomado de las cubetas se devolvio: la siguiente solicitud entra sin esperar
+    assert robot.limiteSolicitudes.disponibles >= 1
+    assert robot.limiteTokens.disponibles == 1000
+
+
+def test_429_agotado_no_cambia_conversacion(ia):
+    modulo, respuestas = ia
+    respuestas.extend([RateLimitError()] * (modulo.REINTENTOS + 1))
+    robot = modulo.IA(modulo.CONTEXTO)
+    with pytest.raises(RateLimitError):
+        robot.respuesta("hola")
+    assert robot.conversacion == []
+    assert robot.contabilidad.sesion['limites'] == modulo.REINTENTOS + 1
+
+
+def test_error_del_api_se_registra_en_el_enrutador(ia):
+    modulo, respuestas = ia
+    from enrutador import Enrutador, LATENCIA_ERROR
+    respuestas.extend([ValueError("sin conexion")] * 5 + [Respuesta(" Hola.")])
+    robot = modulo.IA(modulo.CONTEXTO, enrutador=Enrutador())
+    for i in range(5):
+        with pytest.raises(ValueError):
+            robot.generar(u"¿Qué es la fotosíntesis?")
+    assert robot.enrutador.latencias.p95(("gpt-3.5-turbo-instruct", 'explicacion')) == LATENCIA_ERROR
+    # El nivel de explicacion quedo degradado, la siguiente pregunta baja de nivel
+    assert robot.generar(u"¿Qué es la fotosíntesis?") == " Hola."
+    assert robot.enrutador.latencias.muestras[("gpt-3.5-turbo-instruct", 'normal')][0][1] < 1.0
+
+
+def test_sin_espera_maxima_hace_fila(ia):
+    modulo, respuestas = ia
+    respuestas.extend([Respuesta(" Hola.")] * 2)
+    robot = modulo.IA(modulo.CONTEXTO, solicitudesPorMinuto=1, esperaMaxima=0)
+    robot.generar("hola")
+    with pytest.raises(modulo.LimiteExcedido):
+        robot.generar("hola")
+    # Para un lote: en lugar de descartar se espera el relleno de la cubeta
+    robot = modulo.IA(modulo.CONTEXTO, solicitudesPorMinuto=600, esperaMaxima=None)
+    robot.limiteSolicitudes.disponibles = 0
+    assert robot.generar("hola") == " Hola."
@@ -0,0 +1,77 @@
+# -*- encoding: UTF-8 -*-
+"""
+Pruebas de MaquinaConversacion, sin NAOqi: las acciones son funciones locales
+"""
+
+from maquina import MaquinaConversacion, TRANSICIONES
+
+import threading
+import time
+
+
+def test_recorrido_completo():
+    estados = []
+    maquina = MaquinaConversacion({
+        'espera': lambda datos: 'activar',
+        'saludo': lambda datos: 'listo',
+        'escuchando': lambda datos: 'frase',
+        'pensando': lambda datos: ('respuesta', 'Hola.'),
+        'hablando': lambda datos: 'despedir' if datos == 'Hola.' else 'nada',
+        'despedida': lambda datos: 'listo',
+    }, alCambiar=estados.append)
+    maquina.ejecutar()
+    assert estados == ['espera', 'saludo', 'escuchando', 'pensando', 'hablando', 'despedida', 'fin']
+
+
+def test_evento_desconocido_se_ignora():
+    maquina = MaquinaConversacion({}, estadoInicial='escuchando')
+    assert maquina.transicion('respuesta') == None
+    assert maquina.estado == 'escuchando'
+    assert maquina.turno == 0
+
+
+def test_evento_de_accion_vieja_se_descarta():
+    # Se interrumpe 'hablando' con 'despedir'; el 'listo' que llega despues del turno de 'hablando'
+    # no debe terminar la despedida antes de que su accion acabe
+    terminada = []
+    alLlegarFin = []
+
+    def despedir(datos):
+        time.sleep(0.1)
+        terminada.append(True)
+        return 'listo'
+
+    def cambiar(estado):
+        if estado == 'fin':
+            alLlegarFin.append(len(terminada) > 0)
+
+    maquina = MaquinaConversacion({'despedida': despedir}, estadoInicial='hablando', alCambiar=cambiar)
+    maquina.disparar('despedir')
+    maquina.eventos.put(('listo', None, maquina.turno))
+    maquina.ejecutar()
+    assert alLlegarFin == [True]
+    assert maquina.estado == 'fin'
+
+
+def test_error_en_accion_no_detiene_la_maquina():
+    # Si una accion falla se dispara 'nada'; todos los estados con accion deben aceptarlo
+    for estado in ['espera', 'saludo', 'escuchando', 'pensando', 'hablando', 'despedida']:
+        assert (estado, 'nada') in TRANSICIONES
+
+    def fallar(datos):
+        raise RuntimeError("sin conexion")
+
+    estados = []
+    maquina = MaquinaConversacion({
+        'saludo': fallar,
+        'escuchando': lambda datos: 'frase' if estados.count('escuchando') == 1 else 'despedir',
+        'pensando': lambda datos: ('respuesta', 'Hola.'),
+        'hablando': fallar,
+        'despedida': fallar,
+    }, estadoInicial='saludo', alCambiar=estados.append)
+    hilo = threading.Thread(target=maquina.ejecutar)
+    hilo.daemon = True
+    hilo.start()
+    hilo.join(5)
+    assert not hilo.is_alive()
+    assert estados == ['saludo', 'escuchando', 'pensando', 'hablando', 'escuchando', 'despedida', 'fin']
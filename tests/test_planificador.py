@@ -0,0 +1,47 @@
+# -*- encoding: UTF-8 -*-
+"""
+Pruebas del Planificador con generadores locales en lugar de la IA
+"""
+
+from planificador import Planificador, RESPUESTA_GENERICA
+
+import threading
+import time
+
+
+def test_respuesta_directa_se_registra():
+    turnos = []
+    planificador = Planificador(lambda texto: "Respuesta a " + texto, registrar=lambda *turno: turnos.append(turno))
+    assert planificador.responder("hola") == "Respuesta a hola"
+    assert turnos == [("hola", "Respuesta a hola")]
+    assert planificador.conteo['directo'] == 1
+
+
+def test_consulta_tardia_no_se_registra():
+    turnos = []
+    termino = threading.Event()
+
+    def lento(texto):
+        time.sleep(0.2)
+        termino.set()
+        return "Respuesta tardia"
+
+    planificador = Planificador(lento, limiteSuave=0.02, limiteDuro=0.05, registrar=lambda *turno: turnos.append(turno))
+    assert planificador.responder("pregunta") == RESPUESTA_GENERICA
+    assert termino.wait(1.0)
+    time.sleep(0.05)
+    # Solo queda el respaldo que se dijo, la respuesta tardia se descarta
+    assert turnos == [("pregunta", RESPUESTA_GENERICA)]
+    assert planificador.conteo['limite'] == 1
+
+
+def test_error_usa_respaldo():
+    turnos = []
+
+    def falla(texto):
+        raise RuntimeError("sin red")
+
+    planificador = Planificador(falla, registrar=lambda *turno: turnos.append(turno))
+    assert planificador.responder("gracias") == "Con mucho gusto, para eso estoy."
+    assert turnos == [("gracias", "Con mucho gusto, para eso estoy.")]
+    assert planificador.conteo['error'] == 1
@@ -0,0 +1,81 @@
+# -*- encoding: UTF-8 -*-
+"""
+Pruebas del anillo de memoria compartida y de los llamados del puente, en un solo proceso
+"""
+
+from puente import AnilloAudio, Puente
+
+import os
+import pytest
+import socket
+import threading
+
+
+def anillos(tmp_path, capacidad=100):
+    ruta = str(tmp_path / "anillo")
+    escritor = AnilloAudio(ruta, capacidad, crear=True)
+    return escritor, AnilloAudio(ruta)
+
+
+def test_leer_bloque(tmp_path):
+    escritor, lector = anillos(tmp_path)
+    posicion = escritor.escribir(b"a" * 40)
+    assert posicion == 0
+    assert lector.leer(posicion, 40) == b"a" * 40
+    escritor.cerrar(borrar=True)
+    assert not os.path.exists(str(tmp_path / "anillo"))
+
+
+def test_bloque_que_da_la_vuelta(tmp_path):
+    escritor, lector = anillos(tmp_path)
+    escritor.escribir(b"a" * 60)
+    datos = bytes(bytearray(range(60)))
+    posicion = escritor.escribir(datos)     # Ocupa los bytes 60 a 99 y 0 a 19
+    assert posicion == 60
+    assert lector.leer(posicion, 60) == datos
+
+
+def test_bloque_sobrescrito(tmp_path):
+    escritor, lector = anillos(tmp_path)
+    primero = escritor.escribir(b"a" * 60)
+    segundo = escritor.escribir(b"b" * 60)
+    assert lector.leer(primero, 60) == None
+    assert lector.leer(segundo, 60) == b"b" * 60
+
+
+def test_escritura_en_curso_invalida_el_bloque(tmp_path):
+    # El escritor reserva el espacio antes de copiar: un lector atrasado no acepta un bloque a medio sobrescribir
+    escritor, lector = anillos(tmp_path)
+    primero = escritor.escribir(b"a" * 60)
+    segundo = escritor.reservar(60)
+    assert lector.leer(primero, 60) == None
+    escritor.copiar(segundo, b"b" * 60)
+    assert lector.leer(segundo, 60) == b"b" * 60
+
+
+def test_llamar_y_notificar():
+    a, b = socket.socketpair()
+    avisos = []
+    recibido = threading.Event()
+
+    def avisar(texto):
+        avisos.append(texto)
+        recibido.set()
+
+    class Robot():
+        def sumar(self, x, y):
+            return x + y
+
+    servidor = Puente(a, {'nao': Robot(), 'aviso': avisar})
+    cliente = Puente(b)
+    try:
+        assert cliente.llamar('nao.sumar', 2, 3) == 5
+        cliente.notificar('aviso', u'hola')
+        assert recibido.wait(1.0)
+        assert avisos == [u'hola']
+        with pytest.raises(RuntimeError, match='saltar'):
+            cliente.llamar('nao.saltar')
+    finally:
+        cliente.cerrar()
+        servidor.cerrar()
+    assert servidor.cerrado.wait(1.0)